@@ -63,6 +63,15 @@ class Import_GMDC(bpy.types.Operator, ImportHelper):
 			description = "If some vertices differ only in texture coordinates, then they are fused together (removes seams)",
 			default     = True )
 
+	weld_tolerance : FloatProperty(
+			name        = "Tolerance",
+			description = "Fuse vertices whose coordinates, normals, weights, etc. differ by at most this value (0 - exact match)",
+			default     = 0.0,
+			min         = 0.0,
+			max         = 0.01,
+			step        = 0.01,
+			precision   = 5 )
+
 	import_bmesh : BoolProperty(
 			name        = "Bounding geometry",
 			description = "Import bounding geometry",
@@ -85,6 +94,11 @@ class Import_GMDC(bpy.types.Operator, ImportHelper):
 			description = "Import all bones/transforms; otherwise, used bones only",
 			default     = False )
 
+	use_cache : BoolProperty(
+			name        = "Use cache",
+			description = "Keep parsed geometry and skeletons in a cache in the temporary directory (up to 512 MiB); unchanged files are not parsed again",
+			default     = False )
+
 	# other
 	#
 	save_log : BoolProperty(
@@ -105,10 +119,12 @@ class Import_GMDC(bpy.types.Operator, ImportHelper):
 			settings={
 			    'import_mode' : self.import_mode,
 			 'remove_doubles' : self.remove_doubles,
+			 'weld_tolerance' : self.weld_tolerance,
 			   'import_bmesh' : self.import_bmesh,
 			  'replace_inv_t' : self.replace_inv_t,
 			  'selected_only' : self.selected_only,
 			      'all_bones' : self.all_bones,
+			      'use_cache' : self.use_cache,
 			       'save_log' : self.save_log,
 			})
 		return {'FINISHED'}
@@ -118,6 +134,8 @@ class Import_GMDC(bpy.types.Operator, ImportHelper):
 		box.prop(self, 'import_mode')
 		if self.import_mode == 'GEOMETRY':
 			box.prop(self, 'remove_doubles')
+			if self.remove_doubles:
+				box.prop(self, 'weld_tolerance')
 			box.prop(self, 'import_bmesh')
 			box.prop(self, 'replace_inv_t')
 		if self.import_mode == 'SKELETON':
@@ -125,6 +143,7 @@ class Import_GMDC(bpy.types.Operator, ImportHelper):
 			box.prop(self, 'all_bones')
 		box = self.layout.box()
 		box.label(text="Other", icon='MODIFIER')
+		box.prop(self, 'use_cache')
 		box.prop(self, 'save_log')
 
 
@@ -0,0 +1,268 @@
+#-------------------------------------------------------------------------------
+# Copyright (C) 2016  DjAlex88 (https://github.com/djalex88/)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#-------------------------------------------------------------------------------
+
+
+# Benchmark of QFS decompression (gmdc_tools.qfs_decompress) against a simple
+# byte-by-byte reference decoder.
+#
+#   python benchmarks/qfs_bench.py [file ...] [--repeat N] [--output FILE]
+#
+# Files (*.5gd, *.5cr, etc.) are compressed by a simple compressor below;
+# compressed resources of *.package files are used as they are.
+# Without files, synthetic samples are used (generated mesh, runs, text,
+# incompressible data). Every result is checked against the reference decoder.
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gmdc_tools import DataGroup, IndexGroup, GeometryData, pack_gmdc_file, load_package, qfs_decompress
+
+########################################
+##  Reference decoder
+########################################
+
+def reference_decompress(data, offset=0):
+
+	# straightforward decoder: output grows by one byte at a time,
+	# back-references are copied byte by byte
+
+	flags = data[offset]
+	n = 4 if flags & 0x80 else 3
+	pos = offset + 2 + (n if flags & 0x01 else 0)
+	size = int.from_bytes(bytes(data[pos : pos+n]), 'big')
+	pos+= n
+
+	out = bytearray()
+	while pos < len(data):
+		b0 = data[pos]
+		if b0 < 0x80:
+			b1 = data[pos+1]
+			pos+= 2
+			plain = b0 & 0x03
+			copy = ((b0 & 0x1C) >> 2) + 3
+			offset = ((b0 & 0x60) << 3) + b1 + 1
+		elif b0 < 0xC0:
+			b1 = data[pos+1]
+			b2 = data[pos+2]
+			pos+= 3
+			plain = b1 >> 6
+			copy = (b0 & 0x3F) + 4
+			offset = ((b1 & 0x3F) << 8) + b2 + 1
+		elif b0 < 0xE0:
+			b1 = data[pos+1]
+			b2 = data[pos+2]
+			b3 = data[pos+3]
+			pos+= 4
+			plain = b0 & 0x03
+			copy = ((b0 & 0x0C) << 6) + b3 + 5
+			offset = ((b0 & 0x10) << 12) + (b1 << 8) + b2 + 1
+		else:
+			plain = ((b0 & 0x1F) << 2) + 4 if b0 < 0xFC else b0 & 0x03
+			copy = 0
+			pos+= 1
+		for i in range(plain):
+			out.append(data[pos])
+			pos+= 1
+		for i in range(copy):
+			out.append(out[-offset])
+		if b0 >= 0xFC:
+			break
+
+	if len(out) != size:
+		raise ValueError('Wrong uncompressed size (%i, expected %i)' % (len(out), size))
+
+	return out
+
+########################################
+##  Compressor (test data)
+########################################
+
+def compress(data, max_chain=8):
+
+	# greedy LZ77 with hash chains of 3-byte prefixes; produces all kinds
+	# of control codes; returns resource with package prefix (offset 4)
+
+	data = bytes(data)
+	end = len(data)
+	out = bytearray()
+	chains = {}
+	lit = 0 # start of pending literals
+
+	def put_literals(upto):
+		# literal runs of 4..112 bytes; up to 3 bytes remain pending
+		nonlocal lit
+		while upto - lit >= 4:
+			k = min((upto - lit) & ~3, 112)
+			out.append(0xE0 + (k >> 2) - 1)
+			out.extend(data[lit:lit+k])
+			lit+= k
+
+	i = 0
+	while i < end - 3:
+		key = data[i:i+3]
+		chain = chains.setdefault(key, [])
+		length, offset = 0, 0
+		for j in reversed(chain[-max_chain:]):
+			if i - j > 131072:
+				break
+			k = 3
+			while i + k < end and k < 1028 and data[j+k] == data[i+k]:
+				k+= 1
+			if k > length:
+				length, offset = k, i - j
+		chain.append(i)
+
+		if length < 3 or (length < 4 and offset > 1024) or (length < 5 and offset > 16384):
+			i+= 1
+			continue
+
+		put_literals(i)
+		plain = i - lit
+		o = offset - 1
+		if length <= 10 and offset <= 1024:
+			out+= bytes(( ((o >> 3) & 0x60) | ((length - 3) << 2) | plain, o & 0xFF ))
+		elif length <= 67 and offset <= 16384:
+			out+= bytes(( 0x80 | (length - 4), (plain << 6) | (o >> 8), o & 0xFF ))
+		else:
+			c = length - 5
+			out+= bytes(( 0xC0 | ((o >> 12) & 0x10) | ((c >> 6) & 0x0C) | plain, (o >> 8) & 0xFF, o & 0xFF, c & 0xFF ))
+		out+= data[lit:i]
+
+		for k in range(i + 1, min(i + length, end - 3)):
+			chains.setdefault(data[k:k+3], []).append(k)
+		i+= length
+		lit = i
+
+	put_literals(end)
+	out.append(0xFC + end - lit)
+	out+= data[lit:end]
+
+	s = b'\x10\xfb' + end.to_bytes(3, 'big') + out
+	return (len(s) + 4).to_bytes(4, 'little') + s
+
+########################################
+##  Samples
+########################################
+
+def mesh_sample(n=160):
+
+	# GMDC file of n x n grid (rigged, with texture coords)
+
+	rnd = random.Random(1)
+	g = DataGroup()
+	for y in range(n):
+		for x in range(n):
+			u, v = x / (n - 1), y / (n - 1)
+			h = 0.1 * math.sin(6*u) * math.cos(4*v) + rnd.uniform(-0.001, 0.001)
+			g.vertices.append( (u - 0.5, v - 0.5, h) )
+			g.normals.append( (0.0, -0.6 * math.cos(6*u) * math.cos(4*v), 1.0) )
+			g.tex_coords.append( (u, 1.0 - v) )
+			b = min(3, x * 4 // n)
+			g.bones.append( (b, min(3, b + 1), 0xff, 0xff) )
+			g.bone_counts.append(2)
+			w = x * 4 / n - b
+			g.weights.append( (1.0 - w,) )
+	g.count = n * n
+
+	ig = IndexGroup('body')
+	ig.data_group_index = 0
+	ig.indices = []
+	for y in range(n - 1):
+		for x in range(n - 1):
+			i = y * n + x
+			ig.indices.append( (i, i + 1, i + n) )
+			ig.indices.append( (i + 1, i + n + 1, i + n) )
+	ig.bones = [0, 1, 2, 3]
+
+	inv = [((0.0, 0.0, 0.0, 1.0), (float(i), 0.0, 0.0)) for i in range(4)]
+	return bytes(pack_gmdc_file('bench_tslocator_gmdc', GeometryData([g], [ig], inv)))
+
+def synthetic_samples():
+	rnd = random.Random(2)
+	yield 'mesh', compress(mesh_sample())
+	yield 'runs', compress(b''.join(bytes((rnd.randrange(4),)) * rnd.randrange(1, 300) for i in range(4000)))
+	yield 'text', compress(b'cGeometryDataContainer cTransformNode cShapeRefNode ' * 10000)
+	yield 'random', compress(os.urandom(200000))
+
+def file_samples(filenames):
+	for filename in filenames:
+		if filename.lower().endswith('.package'):
+			with load_package(filename, 0) as package:
+				for e in package.entries:
+					if e.uncompressed_size is not None:
+						yield '%s:%08X-%08X' % (os.path.basename(filename), e.group, e.instance), bytes(package.read(e, raw=True))
+		else:
+			with open(filename, 'rb') as f:
+				yield os.path.basename(filename), compress(f.read())
+
+########################################
+
+def best_time(func, repeat):
+	t = None
+	for i in range(repeat):
+		t0 = time.perf_counter()
+		func()
+		dt = time.perf_counter() - t0
+		t = dt if t is None else min(t, dt)
+	return t
+
+def main():
+	parser = argparse.ArgumentParser(description='QFS decompression benchmark')
+	parser.add_argument('files', nargs='*', help='resource files or packages (default: synthetic samples)')
+	parser.add_argument('--repeat', type=int, default=5, help='best of N runs')
+	parser.add_argument('--output', help='also write results into this file')
+	args = parser.parse_args()
+
+	lines = ['%-32s %10s %10s %11s %11s %8s %10s' % ('sample', 'size', 'packed', 'reference', 'qfs', 'speedup', 'MB/s')]
+	print(lines[0])
+
+	total_ref = total_qfs = 0.0
+	for name, data in (file_samples(args.files) if args.files else synthetic_samples()):
+		expected = reference_decompress(data, 4)
+		out = bytearray(len(expected))
+		if qfs_decompress(data, out, 4) != expected:
+			raise AssertionError('Wrong result: %s' % name)
+
+		t_ref = best_time(lambda: reference_decompress(data, 4), max(1, args.repeat // 2))
+		t_qfs = best_time(lambda: qfs_decompress(data, out, 4), args.repeat)
+		total_ref+= t_ref
+		total_qfs+= t_qfs
+
+		lines.append('%-32s %10i %10i %10.4fs %10.4fs %7.1fx %10.1f' % (name[:32], len(expected), len(data), t_ref, t_qfs, t_ref / t_qfs, len(expected) / t_qfs / 1e6))
+		print(lines[-1])
+
+	if total_qfs:
+		lines.append('%-32s %10s %10s %10.4fs %10.4fs %7.1fx' % ('total', '', '', total_ref, total_qfs, total_ref / total_qfs))
+		print(lines[-1])
+
+	if args.output:
+		with open(args.output, 'w') as f:
+			f.write('\n'.join(lines) + '\n')
+
+if __name__ == '__main__':
+	main()
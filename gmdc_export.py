@@ -244,6 +244,17 @@ def export_geometry(scene, settings):
 				tri_norm.append(tuple(mesh.loops[loop_idx].normal))
 			mesh_normals.append(tri_norm)
 
+		# vertex indices of the imported geometry (see importer)
+		#
+		original_index_attribute = mesh.attributes.get("OriginalIndex")
+		if original_index_attribute != None and original_index_attribute.domain == 'CORNER':
+			flat_original_index = [0] * len(original_index_attribute.data)
+			original_index_attribute.data.foreach_get('value', flat_original_index)
+			original_index = [flat_original_index[loop_idx] for tri in mesh.loop_triangles for loop_idx in tri.loops]
+			del flat_original_index
+		else:
+			original_index = None
+
 		# texture coords
 		#
 		mesh_tex_coords = []
@@ -664,6 +675,20 @@ def export_geometry(scene, settings):
 
 		unique_verts = [v for v, i in sorted(unique_verts.items(), key=lambda x: x[1])]
 
+		if original_index:
+			# keep vertex order of the imported geometry
+			order = {} # { index -> original_index }
+			for k, i in zip(indices, original_index):
+				if i < order.get(k, i+1):
+					order[k] = i
+			order = sorted(range(len(unique_verts)), key=order.__getitem__)
+			new_index = [0] * len(order)
+			for i, k in enumerate(order):
+				new_index[k] = i
+			unique_verts = [unique_verts[k] for k in order]
+			indices = [new_index[k] for k in indices]
+			del order, new_index
+
 		log( '\x20\x20--Vertex count: %i -> %i' % (len(all_vertices), len(unique_verts)) )
 
 		del all_vertices
@@ -725,7 +750,9 @@ def export_geometry(scene, settings):
 		if T2:
 			group.tex_coords2.extend(T2)
 		if rigging:
-			group.bones.extend(B)
+			# pack bone indices
+			group.bones.extend((b + (0xff, 0xff, 0xff, 0xff))[:4] for b in B)
+			group.bone_counts.extend(map(len, B))
 			group.weights.extend(W)
 		if settings['export_tangents']:
 			group.tangents.extend(X)
@@ -927,7 +954,7 @@ def export_geometry(scene, settings):
 	if settings['align_normals'] and settings['align_target']:
 		from .gmdc_tools import load_resource
 		try:
-			g = load_resource(settings['align_target'], log_level=0).nodes[0].geometry
+			g = load_resource(settings['align_target'], log_level=0, lazy=True).nodes[0].geometry
 			verts = g.data_groups[0].vertices
 			norms = g.data_groups[0].normals
 		except:
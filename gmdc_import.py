@@ -33,7 +33,10 @@ from .gmdc_tools import (
 	Vector,
 	Transform,
 	build_transform_tree,
-	convert_normal_to_color
+	load_skeleton,
+	load_geometry,
+	convert_normal_to_color,
+	np
 	)
 
 def popup_message(title, message, icon='NONE'):
@@ -80,21 +83,44 @@ def begin_import(filename, scene, settings):
 	if mode == 'GEOMETRY':
 		log( '--Import bounding geometry:  ', settings['import_bmesh'] )
 		log( '--Remove doubles:            ', settings['remove_doubles'] )
+		log( '--Weld tolerance:            ', settings['weld_tolerance'] )
 		log( '--Replace inverse transforms:', settings['replace_inv_t'] )
+		log( '--Use cache:                 ', settings['use_cache'] )
 	else:
 		assert mode == 'SKELETON'
 		log( '--Only for selected objects: ', settings['selected_only'] )
 		log( '--Import all bones:          ', settings['all_bones'] )
+		log( '--Use cache:                 ', settings['use_cache'] )
 	log()
 
 	# load resource
 	log( 'Opening file "%s"...' % filename )
+	# (with cache, files are parsed only if not cached yet;
+	# geometry is loaded into NumPy arrays, if available, to remove
+	# doubles faster, and converted to lists before importing)
+	geometry = None
+	transform_tree = None
+	use_numpy = np is not None
 	try:
-		res = load_resource(filename, settings['save_log'] and 2 or 1)
+		if mode == 'GEOMETRY' and settings['use_cache']:
+			geometry = load_geometry(filename, settings['save_log'] and 2 or 1, use_numpy=use_numpy,
+				remove_doubles=settings['remove_doubles'], tolerance=settings['weld_tolerance'])
+		elif mode == 'SKELETON' and settings['use_cache']:
+			transform_tree = load_skeleton(filename, settings['save_log'] and 2 or 1)
+		else:
+			res = load_resource(filename, settings['save_log'] and 2 or 1, use_numpy=use_numpy)
 	except:
 		print_last_exception()
 		res = False
-	if mode == 'GEOMETRY':
+	if geometry != None or transform_tree != None:
+		if not (geometry or transform_tree):
+			close_log_file()
+			if mode == 'GEOMETRY':
+				popup_message("Error!", "Could not load geometry file. See log for details.", 'ERROR')
+			else:
+				popup_message("Error!", "Could not load resource node file. See log for details.", 'ERROR')
+			return
+	elif mode == 'GEOMETRY':
 		if not res or not res.nodes or res.nodes[0].type != 'cGeometryDataContainer':
 			res and error( 'Error! Not a GMDC file!' )
 			close_log_file()
@@ -110,15 +136,18 @@ def begin_import(filename, scene, settings):
 
 	try:
 		if mode == 'GEOMETRY':
-			geometry = res.nodes[0].geometry
-			if settings['remove_doubles']:
-				log( 'Removing doubles...' )
-				geometry.remove_doubles()
-				log()
+			if geometry == None:
+				geometry = res.nodes[0].geometry
+				if settings['remove_doubles']:
+					log( 'Removing doubles...' )
+					geometry.remove_doubles(settings['weld_tolerance'])
+					log()
+			geometry.to_lists()
 			import_geometry(scene, geometry, settings)
 
 		else: #### 'SKELETON'
-			transform_tree = build_transform_tree(res.nodes)
+			if transform_tree == None:
+				transform_tree = build_transform_tree(res.nodes)
 			if not import_skeleton(scene, transform_tree, settings):
 				raise Exception()
 
@@ -204,6 +233,9 @@ def import_geometry(scene, geometry, settings):
 		# map indices
 		I = [(S[i], S[j], S[k]) for i, j, k in group.indices]
 
+		# indices before removing doubles (if removed)
+		O = group.original_indices and list(group.original_indices)
+
 		# filtering function
 		def select_data(data):
 			return [x for i, x in enumerate(data) if i in S]
@@ -239,6 +271,8 @@ def import_geometry(scene, geometry, settings):
 					w.append(i)
 		for i in reversed(w):
 			del I[i]
+			if O:
+				del O[i]
 			if T1:
 				del T1[i]
 				if T2:
@@ -253,6 +287,12 @@ def import_geometry(scene, geometry, settings):
 		obj = bpy.data.objects.new(group.name, mesh)
 		active_collection_objects.link(obj)
 
+		# save vertex indices of the original geometry (per loop);
+		# used by the exporter to restore the vertex order
+		if O and len(mesh.loops) == 3*len(O):
+			mesh.attributes.new("OriginalIndex", 'INT', 'CORNER')
+			mesh.attributes["OriginalIndex"].data.foreach_set('value', list(chain(*O)))
+
 		# save original name and flags
 		obj['name'] = group.name
 		obj['flags'] = "%08X" % group.flags
@@ -266,6 +306,7 @@ def import_geometry(scene, geometry, settings):
 		if data_group.bones:
 
 			B = select_data(data_group.bones)
+			C = select_data(data_group.bone_counts)
 			W = select_data(data_group.weights)
 
 			log( '--Assigning vertices to vertex groups...' )
@@ -275,8 +316,8 @@ def import_geometry(scene, geometry, settings):
 				obj.vertex_groups.new(name=f"bone#{idx}")
 
 			# assign vertices to groups
-			for i, (bones, weights) in enumerate(zip(B, W)):
-				for j, bone_idx in enumerate(bones):
+			for i, (bones, n, weights) in enumerate(zip(B, C, W)):
+				for j, bone_idx in enumerate(bones[:n]):
 					if j == 3:
 						w = 1.0 - sum(weights)
 					else:
@@ -20,8 +20,13 @@
 # THE SOFTWARE.
 #-------------------------------------------------------------------------------
 
-from ._common  import log, error, set_log_file, close_log_file, chunk, to_hex, print_last_exception
-from ._gmdc    import DataGroup, IndexGroup, GeometryData, create_gmdc_file
-from ._resfile import load_resource
-from ._tree    import Vector, Matrix, Quaternion, Transform, build_transform_tree
+from ._common  import log, error, set_log_file, close_log_file, chunk, to_hex, print_last_exception, np
+from ._gmdc    import DataGroup, LazyDataGroup, IndexGroup, GeometryData, GeometryInfo, create_gmdc_file, pack_gmdc_file
+from ._gmdc    import SectionRecord, DataGroupRecord, IndexGroupRecord, TailRecord, iter_geometry_records, write_geometry_records, decode_section, encode_section
+from ._resfile import load_resource, load_resource_from_buffer, scan_gmdc, iter_gmdc, patch_gmdc
+from ._tree    import Vector, Matrix, Quaternion, Transform, build_transform_tree, read_transform_tree, write_transform_tree
+from ._cache   import DiskCache, default_cache_dir, file_digest, file_key, load_skeleton, load_geometry
+from ._catalog import build_catalog, scan_resource
+from ._package import PackageEntry, Package, load_package, RESOURCE_TYPES, TYPE_GMDC, TYPE_CRES
+from ._qfs     import is_qfs, qfs_uncompressed_size, qfs_decompress
 from ._normals import convert_normal_to_color
\ No newline at end of file
@@ -0,0 +1,341 @@
+#-------------------------------------------------------------------------------
+# Copyright (C) 2016  DjAlex88 (https://github.com/djalex88/)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#-------------------------------------------------------------------------------
+
+
+
+__all__ = ['DiskCache', 'default_cache_dir', 'file_digest', 'file_key', 'load_skeleton', 'load_geometry']
+
+import hashlib
+import io
+import os
+import tempfile
+from struct import pack, error as StructError
+
+from ._common import *
+from ._codec import *
+from ._gmdc import DataGroup, IndexGroup, GeometryData
+from ._resfile import load_resource
+from ._tree import build_transform_tree, read_transform_tree, write_transform_tree
+
+########################################
+##  Cache directory
+########################################
+
+def default_cache_dir():
+	return os.path.join(tempfile.gettempdir(), 'gmdc_tools_cache')
+
+def file_digest(filename):
+	# hash of file content (hex string)
+	h = hashlib.blake2b(digest_size=20)
+	with open(filename, 'rb') as f:
+		for s in iter(lambda: f.read(1<<20), b''):
+			h.update(s)
+	return h.hexdigest()
+
+def file_key(filename):
+	# fast alternative to file_digest: hash of size, modification time,
+	# first and last 64 KiB of file
+	st = os.stat(filename)
+	h = hashlib.blake2b(pack('<qq', st.st_size, st.st_mtime_ns), digest_size=20)
+	with open(filename, 'rb') as f:
+		h.update(f.read(1<<16))
+		if st.st_size > 1<<16:
+			f.seek(max(1<<16, st.st_size - (1<<16)))
+			h.update(f.read())
+	return h.hexdigest()
+
+DEFAULT_BUDGET = 512 << 20 # bytes
+
+class DiskCache(object):
+	# directory of files named by key;
+	# least recently used files are removed if total size exceeds budget
+	# (None - unlimited)
+
+	def __init__(self, directory=None, budget=DEFAULT_BUDGET):
+		self.directory = directory or default_cache_dir()
+		self.budget = budget
+
+	def path(self, key, ext=''):
+		return os.path.join(self.directory, key + ext)
+
+	def read(self, key, ext=''):
+		# bytes or None
+		path = self.path(key, ext)
+		try:
+			with open(path, 'rb') as f:
+				s = f.read()
+			os.utime(path) # mark as recently used
+		except (IOError, OSError):
+			return None
+		return s
+
+	def write(self, key, ext, data):
+		# written into temporary file first, i.e., readers never see partial data
+		path = self.path(key, ext)
+		try:
+			os.makedirs(self.directory, exist_ok=True)
+			tmp = '%s.%i.tmp' % (path, os.getpid())
+			with open(tmp, 'wb') as f:
+				f.write(data)
+			os.replace(tmp, path)
+		except (IOError, OSError) as e:
+			error( 'Error! Could not write cache file:', e )
+			return False
+		if self.budget != None:
+			self.evict()
+		return True
+
+	def evict(self):
+		# remove least recently used files until total size fits the budget
+		files = []
+		for name in os.listdir(self.directory):
+			if name.endswith('.tmp'):
+				continue
+			path = os.path.join(self.directory, name)
+			try:
+				st = os.stat(path)
+			except OSError:
+				continue
+			files.append( (st.st_mtime_ns, st.st_size, path) )
+		total = sum(size for t, size, path in files)
+		for t, size, path in sorted(files):
+			if total <= self.budget:
+				break
+			try:
+				os.remove(path)
+			except OSError:
+				continue
+			total-= size
+
+
+########################################
+##  Skeleton (CRES)
+########################################
+
+def load_skeleton(filename, log_level=1, cache=None):
+
+	# transform tree of CRES file (see build_transform_tree);
+	# built trees are cached by file content, i.e., on cache hit
+	# the file is not parsed
+
+	cache = cache or DiskCache()
+	key = file_digest(filename)
+
+	s = cache.read(key, '.tree')
+	if s is not None:
+		tree = read_transform_tree(io.BytesIO(s))
+		if tree:
+			if log_level > 0: log( 'Transform tree loaded from cache (%s)' % key )
+			return tree
+
+	res = load_resource(filename, log_level)
+	if not res:
+		return False
+	if not res.nodes or res.nodes[0].type != 'cResourceNode':
+		error( 'Error! Not a CRES file!' )
+		return False
+
+	tree = build_transform_tree(res.nodes)
+
+	f = io.BytesIO()
+	write_transform_tree(f, tree)
+	cache.write(key, '.tree', f.getvalue())
+
+	return tree
+
+
+########################################
+##  Geometry (GMDC)
+########################################
+
+def load_geometry(filename, log_level=1, use_numpy=False, remove_doubles=False, tolerance=0.0, cache=None):
+
+	# geometry of GMDC file (see GeometryData), doubles removed optionally
+	# (see GeometryData.remove_doubles); results are cached by file_key()
+	# and options
+
+	cache = cache or DiskCache()
+	key = '%s:%i:%i:%r' % (file_key(filename), bool(use_numpy), bool(remove_doubles), tolerance)
+	key = hashlib.blake2b(key.encode('latin_1'), digest_size=20).hexdigest()
+
+	s = cache.read(key, '.geometry')
+	if s is not None:
+		geometry = _decode_geometry(s)
+		if geometry:
+			if log_level > 0: log( 'Geometry loaded from cache (%s)' % key )
+			return geometry
+
+	res = load_resource(filename, log_level, use_numpy=use_numpy)
+	if not res:
+		return False
+	if not res.nodes or res.nodes[0].type != 'cGeometryDataContainer':
+		error( 'Error! Not a GMDC file!' )
+		return False
+
+	geometry = res.nodes[0].geometry
+	if remove_doubles:
+		geometry.remove_doubles(tolerance)
+
+	cache.write(key, '.geometry', _encode_geometry(geometry))
+
+	return geometry
+
+#-------------------------------------------------------------------------------
+
+# cached geometry is a tree of tagged values:
+#   N - None, i - int, s - string, l/t - list/tuple of values,
+#   a - table, i.e., list (or array) of numbers or equally sized rows of numbers,
+#       stored as one little-endian array (struct of arrays)
+
+_GEOMETRY_MAGIC = b'GDC\x01'
+
+# struct codes of array types
+_CODES = {'f4': 'f', 'f8': 'd', 'u1': 'B', 'u2': 'H', 'u4': 'L', 'u8': 'Q', 'i1': 'b', 'i2': 'h', 'i4': 'l', 'i8': 'q'}
+
+def _encode_geometry(geometry):
+	f = io.BytesIO()
+	f.write(_GEOMETRY_MAGIC)
+	_write_value(f, [
+		[[getattr(g, k) for k in _DATA_GROUP_KEYS] for g in geometry.data_groups],
+		[[getattr(g, k) for k in _INDEX_GROUP_KEYS] for g in geometry.index_groups],
+		geometry.inverse_transforms,
+		geometry.morph_names,
+		geometry.static_bmesh,
+		geometry.dynamic_bmesh,
+		])
+	return f.getvalue()
+
+def _decode_geometry(s):
+	if s[:4] != _GEOMETRY_MAGIC:
+		return None
+	f = BufferReader(s, 4)
+	try:
+		data_groups, index_groups, inverse_transforms, morph_names, static_bmesh, dynamic_bmesh = _read_value(f)
+	except (StructError, ValueError, KeyError, IndexError, TypeError):
+		return None
+	DATA_GROUPS = []
+	for v in data_groups:
+		group = DataGroup() ; DATA_GROUPS.append(group)
+		group.__dict__.update(zip(_DATA_GROUP_KEYS, v))
+	INDEX_GROUPS = []
+	for v in index_groups:
+		group = IndexGroup(None) ; INDEX_GROUPS.append(group)
+		group.__dict__.update(zip(_INDEX_GROUP_KEYS, v))
+	return GeometryData(DATA_GROUPS, INDEX_GROUPS, inverse_transforms, morph_names, static_bmesh, dynamic_bmesh)
+
+_DATA_GROUP_KEYS = list(DataGroup().__dict__)
+_INDEX_GROUP_KEYS = list(IndexGroup(None).__dict__)
+
+def _write_value(f, v):
+	if v is None:
+		f.write(b'N')
+	elif isinstance(v, int):
+		f.write(b'i' + pack('<q', v))
+	elif isinstance(v, str):
+		s = v.encode('utf-8')
+		f.write(b's' + pack('<l', len(s)) + s)
+	elif is_array(v):
+		_write_array(f, v)
+	elif _write_table(f, v):
+		pass
+	elif isinstance(v, (list, tuple)):
+		f.write((b't' if isinstance(v, tuple) else b'l') + pack('<l', len(v)))
+		for x in v:
+			_write_value(f, x)
+	else:
+		raise TypeError(type(v))
+
+def _write_array(f, a):
+	a = np.ascontiguousarray(a)
+	dtype = a.dtype.newbyteorder('<')
+	s = a.astype(dtype, copy=False).tobytes()
+	f.write(b'a' + pack('<B2sBB', 2, dtype.str[1:].encode(), 0, a.ndim) + pack_array('q', a.shape) + pack('<q', len(s)) + s)
+
+def _write_table(f, v):
+	# list or tuple of numbers or of (nested) equally sized tuples of numbers;
+	# returns False if v is not a table
+	if not isinstance(v, (list, tuple)) or not v:
+		return False
+	shape = []
+	x = v
+	while isinstance(x, (list, tuple)):
+		if not x or len(shape) == 3 or (shape and type(x) != tuple):
+			return False
+		shape.append(len(x))
+		x = x[0]
+	if type(x) == float:
+		code = 'f'
+	elif type(x) == int:
+		code = None
+	else:
+		return False
+	values = v
+	for i in range(len(shape)-1):
+		values = list(chain.from_iterable(values))
+	n = 1
+	for k in shape:
+		n*= k
+	if len(values) != n:
+		return False # rows of different length
+	try:
+		if code == None:
+			m = max(values)
+			code = 'B' if m < 0x100 else 'H' if m < 0x10000 else 'L'
+			if min(values) < 0:
+				code = 'q'
+		s = pack_array(code, values)
+	except (StructError, TypeError, ValueError):
+		return False
+	dtype = {'f': 'f4', 'B': 'u1', 'H': 'u2', 'L': 'u4', 'q': 'i8'}[code]
+	f.write(b'a' + pack('<B2sBB', isinstance(v, tuple), dtype.encode(), 0, len(shape)) + pack_array('q', shape) + pack('<q', len(s)) + s)
+	return True
+
+def _read_value(f):
+	tag = f.read(1)
+	if tag == b'N':
+		return None
+	if tag == b'i':
+		return read_struct(f, '<q')[0]
+	if tag == b's':
+		return f.read(read_int(f)).decode('utf-8')
+	if tag in (b'l', b't'):
+		v = [_read_value(f) for i in range(read_int(f))]
+		return tuple(v) if tag == b't' else v
+	if tag == b'a':
+		kind, dtype, unused, ndim = read_struct(f, '<B2sBB')
+		shape = unpack_array('q', f.read(8*ndim))
+		s = f.read(read_struct(f, '<q')[0])
+		dtype = dtype.decode()
+		if kind == 2: # array
+			if np is None:
+				raise ValueError('NumPy is required')
+			return np.frombuffer(s, '<' + dtype).reshape(shape)
+		code = _CODES[dtype]
+		if ndim == 1:
+			v = unpack_array(code, s)
+		else:
+			v = unpack_records('<%i%s' % (shape[-1], code), s)
+			if ndim == 3:
+				it = iter(v)
+				v = zip(*[it]*shape[1])
+		return tuple(v) if kind else list(v)
+	raise ValueError(tag)
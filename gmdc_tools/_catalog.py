@@ -0,0 +1,226 @@
+#-------------------------------------------------------------------------------
+# Copyright (C) 2016  DjAlex88 (https://github.com/djalex88/)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#-------------------------------------------------------------------------------
+
+
+
+
+__all__ = ['build_catalog', 'scan_resource']
+
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+
+from ._common import *
+from ._resfile import load_resource
+
+########################################
+##  Catalog of GMDC / CRES files
+########################################
+
+# file extensions included when a directory is scanned
+CATALOG_EXTENSIONS = ('.5gd', '.gmdc', '.5cr', '.cres')
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS files (
+	id INTEGER PRIMARY KEY,
+	path TEXT UNIQUE NOT NULL,
+	size INTEGER,
+	mtime_ns INTEGER,
+	resource_name TEXT,
+	node_types TEXT,
+	error TEXT
+);
+CREATE TABLE IF NOT EXISTS linked_resources (
+	file_id INTEGER NOT NULL,
+	idx INTEGER NOT NULL,
+	tgi TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS geometry (
+	file_id INTEGER PRIMARY KEY,
+	inverse_transform_count INTEGER,
+	static_bmesh INTEGER,
+	dynamic_bmesh INTEGER
+);
+CREATE TABLE IF NOT EXISTS data_groups (
+	file_id INTEGER NOT NULL,
+	idx INTEGER NOT NULL,
+	vertex_count INTEGER,
+	sections TEXT
+);
+CREATE TABLE IF NOT EXISTS index_groups (
+	file_id INTEGER NOT NULL,
+	idx INTEGER NOT NULL,
+	name TEXT,
+	data_group_index INTEGER,
+	flags INTEGER,
+	triangle_count INTEGER,
+	bone_count INTEGER
+);
+CREATE TABLE IF NOT EXISTS morphs (
+	file_id INTEGER NOT NULL,
+	idx INTEGER NOT NULL,
+	group_name TEXT,
+	name TEXT
+);
+CREATE TABLE IF NOT EXISTS skeletons (
+	file_id INTEGER PRIMARY KEY,
+	transform_count INTEGER,
+	bone_count INTEGER
+);
+CREATE INDEX IF NOT EXISTS linked_resources_file ON linked_resources (file_id);
+CREATE INDEX IF NOT EXISTS data_groups_file ON data_groups (file_id);
+CREATE INDEX IF NOT EXISTS index_groups_file ON index_groups (file_id);
+CREATE INDEX IF NOT EXISTS index_groups_name ON index_groups (name);
+CREATE INDEX IF NOT EXISTS morphs_file ON morphs (file_id);
+CREATE INDEX IF NOT EXISTS morphs_name ON morphs (name);
+'''
+
+# tables with per-file rows (deleted when a file is scanned again)
+_FILE_TABLES = ('linked_resources', 'geometry', 'data_groups', 'index_groups', 'morphs', 'skeletons')
+
+def scan_resource(filename):
+
+	# summary of GMDC / CRES file as a dict of plain values (picklable);
+	# geometry is scanned with headers_only=True, i.e., data sections are
+	# not read; other nodes are parsed; on failure 'error' is set
+
+	d = {'path': filename, 'resource_name': None, 'node_types': [], 'linked_resources': [], 'error': None}
+	try:
+		res = load_resource(filename, 0, headers_only=True)
+		if not res:
+			d['error'] = 'Could not load file'
+			return d
+
+		types = [node.type for node in res.nodes]
+
+		d['resource_name'] = res.sg_resource_name
+		d['node_types'] = types
+		d['linked_resources'] = ['%08X-%08X-%08X-%08X' % t for t in res.linked_resources]
+
+		if types and types[0] == 'cGeometryDataContainer':
+			info = res.nodes[0].geometry_info
+			d['geometry'] = (
+				info.inverse_transform_count,
+				info.static_bmesh is not None,
+				len(info.dynamic_bmesh or []) - (info.dynamic_bmesh or []).count(None),
+				)
+			section_names = [s[1] for s in info.sections]
+			d['data_groups'] = [(count, ','.join(section_names[i] for i in section_indices)) for count, section_indices, mapping_lengths in info.data_groups]
+			d['index_groups'] = list(info.index_groups)
+			d['morphs'] = list(info.morph_names or [])
+		elif types and types[0] == 'cResourceNode':
+			transforms = [node for node in res.nodes if node.type == 'cTransformNode']
+			d['skeleton'] = (len(transforms), sum(1 for node in transforms if node.T_bone_index is not None))
+	except Exception as e:
+		d['error'] = '%s: %s' % (type(e).__name__, e)
+	return d
+
+def _find_files(paths):
+	for path in paths:
+		if os.path.isdir(path):
+			for root, dirs, files in os.walk(path):
+				dirs.sort()
+				for name in sorted(files):
+					if os.path.splitext(name)[1].lower() in CATALOG_EXTENSIONS:
+						yield os.path.join(root, name)
+		else:
+			yield path
+
+def _insert(db, d, st):
+
+	cur = db.execute('SELECT id FROM files WHERE path = ?', (d['path'],))
+	row = cur.fetchone()
+	if row:
+		file_id = row[0]
+		for table in _FILE_TABLES:
+			db.execute('DELETE FROM %s WHERE file_id = ?' % table, (file_id,))
+		db.execute('UPDATE files SET size = ?, mtime_ns = ?, resource_name = ?, node_types = ?, error = ? WHERE id = ?',
+			(st.st_size, st.st_mtime_ns, d['resource_name'], ','.join(d['node_types']), d['error'], file_id))
+	else:
+		cur = db.execute('INSERT INTO files (path, size, mtime_ns, resource_name, node_types, error) VALUES (?, ?, ?, ?, ?, ?)',
+			(d['path'], st.st_size, st.st_mtime_ns, d['resource_name'], ','.join(d['node_types']), d['error']))
+		file_id = cur.lastrowid
+
+	db.executemany('INSERT INTO linked_resources VALUES (?, ?, ?)', [(file_id, i, tgi) for i, tgi in enumerate(d['linked_resources'])])
+
+	if 'geometry' in d:
+		db.execute('INSERT INTO geometry VALUES (?, ?, ?, ?)', (file_id,) + d['geometry'])
+		db.executemany('INSERT INTO data_groups VALUES (?, ?, ?, ?)', [(file_id, i) + t for i, t in enumerate(d['data_groups'])])
+		db.executemany('INSERT INTO index_groups VALUES (?, ?, ?, ?, ?, ?, ?)', [(file_id, i) + tuple(t) for i, t in enumerate(d['index_groups'])])
+		db.executemany('INSERT INTO morphs VALUES (?, ?, ?, ?)', [(file_id, i) + tuple(t) for i, t in enumerate(d['morphs'])])
+
+	if 'skeleton' in d:
+		db.execute('INSERT INTO skeletons VALUES (?, ?, ?)', (file_id,) + d['skeleton'])
+
+def build_catalog(db_filename, paths, processes=None, log_level=1):
+
+	# scans GMDC / CRES files (directories are searched recursively, see
+	# CATALOG_EXTENSIONS) in a process pool and stores summaries in SQLite
+	# database (see _SCHEMA); files already in the catalog are skipped unless
+	# their size or modification time has changed;
+	# returns number of scanned files or False
+
+	if isinstance(paths, str):
+		paths = [paths]
+
+	db = sqlite3.connect(db_filename)
+	try:
+		db.executescript(_SCHEMA)
+
+		known = dict((path, (size, mtime_ns)) for path, size, mtime_ns in db.execute('SELECT path, size, mtime_ns FROM files'))
+
+		todo = {} # { path -> stat }
+		for path in _find_files(paths):
+			path = os.path.abspath(path)
+			try:
+				st = os.stat(path)
+			except OSError as e:
+				error( 'Error! Could not access "%s" (%s).' % (path, e) )
+				continue
+			if known.get(path) != (st.st_size, st.st_mtime_ns):
+				todo[path] = st
+
+		if log_level > 0:
+			log( 'Scanning %i files (%i up to date)...' % (len(todo), len(known) - (len(set(known) & set(todo)))) )
+
+		if len(todo) > 1 and processes != 1:
+			with ProcessPoolExecutor(processes) as executor:
+				results = executor.map(scan_resource, list(todo), chunksize=32)
+				with db:
+					for d in results:
+						_insert(db, d, todo[d['path']])
+		else:
+			with db:
+				for path in todo:
+					_insert(db, scan_resource(path), todo[path])
+
+		if log_level > 0:
+			failed = db.execute('SELECT COUNT(*) FROM files WHERE error IS NOT NULL').fetchone()[0]
+			log( 'Catalog: %s (files with errors: %i)' % (db_filename, failed) )
+
+	except sqlite3.Error as e:
+		error( 'Error! Could not write catalog "%s" (%s).' % (db_filename, e) )
+		return False
+	finally:
+		db.close()
+
+	return len(todo)
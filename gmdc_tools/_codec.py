@@ -0,0 +1,125 @@
+#-------------------------------------------------------------------------------
+# Copyright (C) 2016  DjAlex88 (https://github.com/djalex88/)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#-------------------------------------------------------------------------------
+
+
+__all__ = ['get_struct', 'read_int', 'read_struct', 'read_records', 'unpack_records', 'unpack_array', 'pack_records', 'pack_array', 'pack_rows', 'BufferWriter']
+
+import sys
+from array import array
+from struct import Struct
+
+from ._common import np, is_array, chain
+
+# compiled formats; the cache is dropped when it grows too large,
+# since array formats include the element count ('<123H', etc.)
+
+_structs = {}
+
+def get_struct(fmt):
+	try:
+		return _structs[fmt]
+	except KeyError:
+		if len(_structs) >= 1024:
+			_structs.clear()
+		s = _structs[fmt] = Struct(fmt)
+		return s
+
+_int = get_struct('<l')
+
+
+# reading
+
+def read_int(f):
+	return _int.unpack(f.read(4))[0]
+
+def read_struct(f, fmt):
+	s = get_struct(fmt)
+	return s.unpack(f.read(s.size))
+
+def read_records(f, fmt, n):
+	# list of n tuples
+	s = get_struct(fmt)
+	return list(s.iter_unpack(f.read(n*s.size))) if n > 0 else []
+
+def unpack_records(fmt, buf):
+	# list of tuples; buf is bytes or any other buffer
+	return list(get_struct(fmt).iter_unpack(buf)) if len(buf) else []
+
+def unpack_array(code, buf):
+	# flat tuple of little-endian values
+	s = get_struct('<' + code)
+	return get_struct('<%i%s' % (len(buf)//s.size, code)).unpack(buf)
+
+
+# writing
+
+def pack_records(fmt, records):
+	p = get_struct(fmt).pack
+	return b''.join(p(*t) for t in records)
+
+def pack_array(code, values):
+	return get_struct('<%i%s' % (len(values), code)).pack(*values)
+
+def pack_rows(code, rows):
+	# rows of equal length (sequence of tuples or 2-d array) of single
+	# type code ('f', 'B' or 'H'), serialized as one little-endian buffer
+	if is_array(rows):
+		return np.ascontiguousarray(rows, '<' + code).tobytes()
+	a = array(code, chain.from_iterable(rows))
+	if rows and len(a) != len(rows)*len(rows[0]):
+		raise ValueError('Rows of different length')
+	if sys.byteorder == 'big':
+		a.byteswap()
+	return a.tobytes()
+
+
+class BufferWriter(object):
+	# file-like writer into a preallocated buffer (bytearray, writable mmap);
+	# values are packed in place with pack_into, no intermediate bytes
+
+	def __init__(self, buf, offset=0):
+		self.buf = buf
+		self.pos = offset
+
+	def write(self, s):
+		n = len(s)
+		self.buf[self.pos:self.pos+n] = s
+		self.pos+= n
+
+	def pack(self, fmt, *values):
+		s = get_struct(fmt)
+		s.pack_into(self.buf, self.pos, *values)
+		self.pos+= s.size
+
+	def pack_rows(self, code, rows):
+		# see pack_rows()
+		if not len(rows):
+			return
+		if is_array(rows):
+			a = np.frombuffer(self.buf, '<' + code, rows.size, self.pos)
+			a[:] = rows.ravel()
+			self.pos+= a.nbytes
+		else:
+			self.pack('<%i%s' % (len(rows)*len(rows[0]), code), *chain.from_iterable(rows))
+
+	def tell(self):
+		return self.pos
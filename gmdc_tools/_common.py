@@ -22,12 +22,19 @@
 
 from __future__ import print_function, division
 
-__all__ = ['log', 'error', 'set_log_file', 'close_log_file', 'chunk', 'chain', 'repeat', 'to_hex', 'print_last_exception', 'read_str', 'write_str']
+__all__ = ['log', 'error', 'set_log_file', 'close_log_file', 'chunk', 'chain', 'repeat', 'to_hex', 'print_last_exception', 'read_str', 'write_str', 'np', 'is_array', 'BufferReader', 'read_view']
 
 import sys
 from itertools import chain, repeat
 from struct import pack, unpack
 
+# NumPy is optional (it is bundled with Blender, but not
+# necessarily available in a standalone Python installation)
+try:
+	import numpy as np
+except ImportError:
+	np = None
+
 if sys.version_info[0] == 3:
 	# Python 3
 	import builtins
@@ -101,11 +108,51 @@ def error(*args):
 		print(s, file=log_file)
 
 
+# in-memory reading
+
+class BufferReader(object):
+	# file-like object over bytes, bytearray, mmap or any other buffer;
+	# read() returns bytes, read_view() returns zero-copy memoryview slices
+
+	def __init__(self, buf, offset=0):
+		self.buf = memoryview(buf)
+		if self.buf.format != 'B' or self.buf.ndim != 1:
+			self.buf = self.buf.cast('B')
+		self.pos = offset
+
+	def read(self, n=-1):
+		return self.read_view(n).tobytes()
+
+	def read_view(self, n=-1):
+		i = self.pos
+		j = len(self.buf) if n < 0 else min(i + n, len(self.buf))
+		self.pos = max(i, j)
+		return self.buf[i:j]
+
+	def tell(self):
+		return self.pos
+
+	def seek(self, offset, whence=0):
+		if whence == 1:
+			offset+= self.pos
+		elif whence == 2:
+			offset+= len(self.buf)
+		self.pos = offset
+		return self.pos
+
+def read_view(f, n):
+	# payload data; no copy for in-memory buffers
+	return f.read_view(n) if isinstance(f, BufferReader) else f.read(n)
+
+
 # other
 
 def chunk(seq, sublen):
 	return [seq[i:i+sublen] for i in xrange(0, len(seq), sublen)]
 
+def is_array(x):
+	return np is not None and isinstance(x, np.ndarray)
+
 def print_last_exception():
 	t, e, tb = sys.exc_info()
 	error( repr(e) )
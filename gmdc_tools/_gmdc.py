@@ -21,11 +21,18 @@
 #-------------------------------------------------------------------------------
 
 
-__all__ = ['DataGroup', 'IndexGroup', 'GeometryData', 'create_gmdc_file']
+__all__ = ['DataGroup', 'LazyDataGroup', 'IndexGroup', 'GeometryData', 'GeometryInfo', 'create_gmdc_file', 'pack_gmdc_file',
+	'SectionRecord', 'DataGroupRecord', 'IndexGroupRecord', 'TailRecord', 'iter_geometry_records', 'write_geometry_records', 'decode_section', 'encode_section']
 
-from struct import pack, unpack
+import io
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from itertools import product
+from math import floor
+from struct import pack
 
 from ._common import *
+from ._codec import *
 from ._node import _SGNode
 
 # Geometry data
@@ -36,7 +43,8 @@ class DataGroup(object):
 		self.vertices   = list()
 		self.normals    = list()
 		self.tex_coords = list()
-		self.bones      = list()
+		self.bones      = list() # packed, 4 indices per vertex (padded with 0xff)
+		self.bone_counts = list() # number of bone influences per vertex
 		self.weights    = list()
 		self.tangents   = list()
 		self.mask       = list()
@@ -46,6 +54,41 @@ class DataGroup(object):
 		self.dVerts = [[], [], [], []]
 		self.dNorms = [[], [], [], []]
 		self.tex_coords2 = []
+		self.remap = list() # set by remove_doubles; remap[old_index] -> new_index
+
+class LazyDataGroup(DataGroup):
+	# created by the loader (lazy=True); sections are decoded
+	# on first access of the corresponding attribute
+	def __init__(self, use_numpy=False):
+		DataGroup.__init__(self)
+		self._use_numpy = use_numpy
+		self._sections = {} # { attribute -> [(type, sub_index, raw_data, index_mapping)] }
+
+	def _add_section(self, attr, type, sub_index, raw_data, mapping=None):
+		self.__dict__.pop(attr, None)
+		if attr == 'bones':
+			self.__dict__.pop('bone_counts', None)
+		self._sections.setdefault(attr, []).append((type, sub_index, raw_data, mapping))
+
+	def __getattr__(self, name):
+		# called only if the attribute is not set yet
+		if name == 'bone_counts':
+			data = _influence_counts(self.bones)
+			setattr(self, name, data)
+			return data
+		try:
+			sections = self.__dict__['_sections'].pop(name)
+		except KeyError:
+			raise AttributeError(name)
+		if name in ('dVerts', 'dNorms'):
+			data = [[], [], [], []]
+			for type, sub_index, raw_data, mapping in sections:
+				data[sub_index] = _decode_attribute(type, raw_data, self._use_numpy, mapping)
+		else:
+			(type, sub_index, raw_data, mapping), = sections
+			data = _decode_attribute(type, raw_data, self._use_numpy, mapping)
+		setattr(self, name, data)
+		return data
 
 class IndexGroup(object):
 	def __init__(self, name):
@@ -56,6 +99,7 @@ class IndexGroup(object):
 		self.tex_coords2 = None
 		self.bones = None
 		self.flags = 0xffffffff
+		self.original_indices = None # set by remove_doubles; indices before removing doubles
 
 class GeometryData(object):
 	def __init__(self, data_groups, index_groups, inverse_transforms=None, morph_names=None, static_bmesh=None, dynamic_bmesh=None):
@@ -66,8 +110,60 @@ class GeometryData(object):
 		self.static_bmesh = static_bmesh
 		self.dynamic_bmesh = dynamic_bmesh
 
-	def remove_doubles(self):
-		_rm_doubles(self)
+	def remove_doubles(self, tolerance=0.0, processes=None, remap=None):
+		# tolerance - weld vertices whose attributes differ by at most this value
+		#   (0 - exact match only)
+		# processes - number of worker processes searching data groups in parallel
+		# remap - { data_group_index -> remap table } (see DataGroup.remap);
+		#   replay tables of a previous call instead of searching these groups
+		_rm_doubles(self, tolerance, processes, remap)
+
+	def restore_doubles(self):
+		# reverse remove_doubles (original vertex order, texture coords
+		# moved back to data groups); tangents and deform mask are not restored,
+		# vertices not used by any triangle get zero texture coords
+		_restore_doubles(self)
+
+	def to_lists(self):
+		# convert array-backed data (see use_numpy) to lists of tuples,
+		# as loaded without NumPy
+		for group in self.data_groups:
+			_group_to_lists(group)
+		for group in self.index_groups:
+			_index_group_to_lists(group)
+
+class GeometryInfo(object):
+	# summary of geometry data; created by the loader with headers_only=True
+	def __init__(self):
+		self.sg_resource_name = None
+		self.sections = []     # [(offset, name, element_count, sub_index, type_of_data, size_in_bytes)]
+		self.data_groups = []  # [(element_count, section_indices, index_mapping_lengths)]
+		self.index_groups = [] # [(name, data_group_index, flags, triangle_count, bone_count)]
+		self.inverse_transform_count = 0
+		self.morph_names = None
+		self.static_bmesh = None  # (vertex_count, index_count)
+		self.dynamic_bmesh = None # [(vertex_count, index_count) or None]
+
+	def __str__(self):
+		s = 'GeometryInfo\n'
+		s+= '--SGResource: "%s"\n' % self.sg_resource_name
+		s+= '--Sections (%i):\n' % len(self.sections)
+		for i, t in enumerate(self.sections):
+			s+= '\x20\x20%i @ %08x - %s, elements: %i, sub_index: %i, type: %i, size: %i\n' % ((i,) + t)
+		s+= '--Data groups (%i):\n' % len(self.data_groups)
+		for i, (count, indices, mapping) in enumerate(self.data_groups):
+			s+= '\x20\x20%i - Elements:%5i, sections: %s' % (i, count, indices) + (', index mapping: %s' % (mapping,) if any(mapping) else '') + '\n'
+		s+= '--Index groups (%i):\n' % len(self.index_groups)
+		for i, t in enumerate(self.index_groups):
+			s+= '\x20\x20%i - Name: "%s", data group: %i, flags: %08X, triangles: %i, bones: %i\n' % ((i,) + t)
+		s+= '--Inverse transforms: %i\n' % self.inverse_transform_count
+		s+= '--Morphs: ' + (str(len(self.morph_names)) if self.morph_names else 'None') + '\n'
+		s+= '--Static bounding mesh: ' + ('%i vertices, %i indices' % self.static_bmesh if self.static_bmesh else 'None') + '\n'
+		s+= '--Dynamic bounding mesh: ' + ('%i parts' % len(self.dynamic_bmesh) if self.dynamic_bmesh else 'None')
+		return s
+
+	def __repr__(self):
+		return self.__str__()
 
 
 class GeometryDataContainer(_SGNode):
@@ -77,26 +173,36 @@ class GeometryDataContainer(_SGNode):
 		self.type = 'cGeometryDataContainer'
 		self.version = 0x04
 
-	def read(self, f, log_level=1):
-		s = f.read(27)
-		if s != b'\x16cGeometryDataContainer\x87\x86\x4F\xAC':
-			error( 'Error! cGeometryDataContainer header:', to_hex(s) )
-			error( '%#x' % f.tell() )
+	def _read_header(self, f):
+		if not self._read_check_header(f, b'\x16cGeometryDataContainer\x87\x86\x4F\xAC'):
 			return False
-		if not self._read_check_version(f, 0x04) or not self._read_cSGResource(f):
+		return self._read_check_version(f, 0x04) and self._read_cSGResource(f)
+
+	def read(self, f, log_level=1, **options):
+		if not self._read_header(f):
 			return False
-		self.geometry = _load_geometry_data(f, log_level)
+		if options.pop('headers_only', False):
+			self.geometry = None
+			self.geometry_info = _scan_geometry_data(f, log_level)
+			self.geometry_info.sg_resource_name = self.sg_resource_name
+			return True
+		self.geometry = _load_geometry_data(f, log_level, **options)
 		return bool(self.geometry)
 
-	def write(self, f):
+	def _write_header(self, f):
 		f.write(b'\x16cGeometryDataContainer\x87\x86\x4F\xAC')
 		self._write_version(f)
 		self._write_cSGResource(f)
+
+	def write(self, f):
+		self._write_header(f)
 		_write_geometry_data(f, self.geometry)
 
 	def __str__(self):
 		s = 'cGeometryDataContainer'
 		g = self.geometry
+		if g is None:
+			return s + '\n' + str(self.geometry_info)
 		s+= '\n' + self._str_cSGResource() + '\n'
 		s+= '--Data groups (%i):\n' % len(g.data_groups)
 		for i, group in enumerate(g.data_groups):
@@ -105,12 +211,12 @@ class GeometryDataContainer(_SGNode):
 			s+= '\x20\x20%i - Elements:%5i, ' % (i, group.count)
 			s+= 'vertex: <'
 			for data, ch in zip(data_list, 'VNT2BWXMK'):
-				if data:
+				if len(data):
 					s+= ch
-			num_dV = sum(map(bool, group.dVerts))
+			num_dV = sum(1 for v in group.dVerts if len(v))
 			if num_dV:
 				s+= ' dV(%i)' % num_dV
-			num_dN = sum(map(bool, group.dNorms))
+			num_dN = sum(1 for v in group.dNorms if len(v))
 			if num_dN:
 				s+= ' dN(%i)' % num_dN
 			s+= '>\n'
@@ -134,33 +240,52 @@ class GeometryDataContainer(_SGNode):
 ##  Geometry loader
 ########################################
 
-def _load_geometry_data(f, log_level):
+_SECTION_TYPES = {
+	b'\x81\x07\x83\x5B': ('Vertices',    'V'), # ThreeFloat
+	b'\x8B\x07\x83\x3B': ('Normals',     'N'), # ThreeFloat
+	b'\xAB\x07\x83\xBB': ('TexCoords',   'T'), # 'UV Coordinates', TwoFloat
+	b'\x11\x01\xD7\xFB': ('BoneIndices', 'B'), # 'Bone Assignments', OneDWord
+	b'\x05\x01\xD7\x3B': ('BoneWeights', 'W'), # ThreeFloat
+	b'\xA0\x2B\xD9\x89': ('Tangents',    'X'), # 'Bump Map Normals', ThreeFloat
+	b'\xE1\xCF\xF2\x5C': ('DiffVerts',  'dV'), # 'Morph Vertex Deltas', ThreeFloat
+	b'\x6A\x3A\x6F\xCB': ('DiffNorms',  'dN'), # 'Normal Morph Deltas', ThreeFloat
+	b'\xDC\xCF\xF2\xDC': ('DiffKeys',    'K'), # 'Morph Vertex Map', OneDWord
+	b'\x95\x07\x83\xDB': ('DeformMask',  'M'), # 'UV Coordinate Deltas', OneDWord
+	b'\x82\xEE\x4D\x7C': ('0x7C4DEE82',  '1'), # "Target Indices", ThreeFloat
+	b'\x5C\xFC\x4A\x5C': ('0x5C4AFC5C',  '2'), # "Blend Weights", ?
+	b'\x56\xFC\x4A\x1C': ('0x1C4AFC56',  '3'), # "Blend Indices", ?
+	b'\xC3\x13\x41\x11': ('EP4VertexID', '4'), # "(EP4) VertexID", DWord. Only the first two bytes appear to have values. Similar to the bone indice DWord that represents the 4 potential effector bones?
+	b'\xCD\x13\x41\x11': ('EP4RegionMask', '5'), # "(EP4) RegionMask", DWord. Only the first two bites appear to have values. Often mostly zeroes. No repeats. The DWord may represent a single value?
+	# 0xCB7206A1 	Colour
+	# 0xEB720693 	Colour Deltas
+	# 0x9BB38AFB 	Binormals
+	# 0x69D92B93 	Bump Map Normal Deltas
+	}
+
+# section type (as in DataGroup sections) -> magic number
+_SECTION_MAGIC = dict(({'4': 'VId', '5': 'RM'}.get(v[1], v[1]), k) for k, v in _SECTION_TYPES.items())
+
+def _load_geometry_data(f, log_level, use_numpy=False, lazy=False, threads=None):
+
+	# use_numpy - decode sections into typed (count, components) arrays
+	#   instead of lists of tuples (float32 for vectors, uint8 for 4-byte
+	#   elements; bone indices are kept padded with 0xff)
+	# lazy - create LazyDataGroup objects, i.e., sections are decoded
+	#   on first access of the corresponding attribute
+	# threads - number of worker threads used to decode sections and to
+	#   apply index mappings (ignored if lazy); with use_numpy the arrays
+	#   are copied out of the file buffer by the workers, which does not
+	#   hold the GIL
+
+	if use_numpy and np is None:
+		error( 'Error! NumPy is not available.' )
+		return False
 
 	#
 	# sections
 	#
 
-	dd = {
-		b'\x81\x07\x83\x5B': ('Vertices',    'V'), # ThreeFloat
-		b'\x8B\x07\x83\x3B': ('Normals',     'N'), # ThreeFloat
-		b'\xAB\x07\x83\xBB': ('TexCoords',   'T'), # 'UV Coordinates', TwoFloat
-		b'\x11\x01\xD7\xFB': ('BoneIndices', 'B'), # 'Bone Assignments', OneDWord
-		b'\x05\x01\xD7\x3B': ('BoneWeights', 'W'), # ThreeFloat
-		b'\xA0\x2B\xD9\x89': ('Tangents',    'X'), # 'Bump Map Normals', ThreeFloat
-		b'\xE1\xCF\xF2\x5C': ('DiffVerts',  'dV'), # 'Morph Vertex Deltas', ThreeFloat
-		b'\x6A\x3A\x6F\xCB': ('DiffNorms',  'dN'), # 'Normal Morph Deltas', ThreeFloat
-		b'\xDC\xCF\xF2\xDC': ('DiffKeys',    'K'), # 'Morph Vertex Map', OneDWord
-		b'\x95\x07\x83\xDB': ('DeformMask',  'M'), # 'UV Coordinate Deltas', OneDWord
-		b'\x82\xEE\x4D\x7C': ('0x7C4DEE82',  '1'), # "Target Indices", ThreeFloat
-		b'\x5C\xFC\x4A\x5C': ('0x5C4AFC5C',  '2'), # "Blend Weights", ?
-		b'\x56\xFC\x4A\x1C': ('0x1C4AFC56',  '3'), # "Blend Indices", ?
-		b'\xC3\x13\x41\x11': ('EP4VertexID', '4'), # "(EP4) VertexID", DWord. Only the first two bytes appear to have values. Similar to the bone indice DWord that represents the 4 potential effector bones?
-		b'\xCD\x13\x41\x11': ('EP4RegionMask', '5'), # "(EP4) RegionMask", DWord. Only the first two bites appear to have values. Often mostly zeroes. No repeats. The DWord may represent a single value?
-		# 0xCB7206A1 	Colour
-		# 0xEB720693 	Colour Deltas
-		# 0x9BB38AFB 	Binormals
-		# 0x69D92B93 	Bump Map Normal Deltas
-		}
+	dd = _SECTION_TYPES
 
 	if log_level:
 		log( '//// Reading GMDC...' )
@@ -170,15 +295,15 @@ def _load_geometry_data(f, log_level):
 
 	# number of sections
 	#
-	section_count = unpack('<l', f.read(4))[0]
+	section_count = read_int(f)
 	log_level and log( 'Number of sections: %i' % section_count )
 
 	for k in xrange(section_count):
 
 		offset = f.tell()
-		i = unpack('<l', f.read(4))[0]
+		i = read_int(f)
 		s1, s2 = dd[f.read(4)]
-		sub_idx, type_of_data, unknown1, j = unpack('<4l', f.read(16))
+		sub_idx, type_of_data, unknown1, j = read_struct(f, '<4l')
 
 		log_level and log( 'Section [%03i] @ %08x - ' % (k, offset) + s1 + (j==0 and (i and '\x20(empty, but count is %i)'%i or '\x20(empty)') or '') )
 		if i and log_level > 1:
@@ -210,47 +335,46 @@ def _load_geometry_data(f, log_level):
 
 			assert i*cc*4 == j
 
-			data = chunk(unpack('<%if'%(i*cc), f.read(j)), cc)
-			SECTIONS.append( (s2, sub_idx, data) )
+			# raw data; decoded when assigned to a group
+			SECTIONS.append( (s2, sub_idx, _SectionData(offset, read_view(f, j), i, cc)) )
 
 		elif s1 == 'BoneIndices':
 			
 			assert i*4 == j
 
-			data = unpack('%iB'%j, f.read(j))
+			s = read_view(f, j)
 
-			log_level>1 and log( '--Index range: [%i-%i]' % (min(data), max(x for x in data if x!=0xff)) )
+			if log_level > 1:
+				v = bytearray(s)
+				log( '--Index range: [%i-%i]' % (min(v), max(x for x in v if x!=0xff)) )
 
-			data = [v[:(v+(0xff,)).index(0xff)] for v in chunk(data, 4)]
-			SECTIONS.append( ('B', sub_idx, data) )
+			SECTIONS.append( ('B', sub_idx, _SectionData(offset, s, i, 4)) )
 
 		elif s1 == 'DiffKeys' or s1 == 'DeformMask':
 			
 			assert i*4 == j
 
-			data = chunk(unpack('%iB'%j, f.read(j)), 4)
-			SECTIONS.append( (s2, sub_idx, data) )
+			SECTIONS.append( (s2, sub_idx, _SectionData(offset, read_view(f, j), i, 4)) )
 
 		elif s1 == 'EP4VertexID':
 
 			assert i*4 == j
 
-			data = chunk(unpack('%iB'%j, f.read(j)), 4)
-			SECTIONS.append( ('VId', sub_idx, data) )
+			SECTIONS.append( ('VId', sub_idx, _SectionData(offset, read_view(f, j), i, 4)) )
 
 		elif s1 == 'EP4RegionMask':
 
 			assert i*4 == j
 
-			data = chunk(unpack('%iB'%j, f.read(j)), 4)
-			SECTIONS.append( ('RM', sub_idx, data) )
+			SECTIONS.append( ('RM', sub_idx, _SectionData(offset, read_view(f, j), i, 4)) )
 
 		else: # 0x7C4DEE82, 0x5C4AFC5C, 0x1C4AFC56
 
 			# component count
 			cc = type_of_data + 1
 
-			V = chunk(unpack('<%if'%(j//4), f.read(j)), cc)
+			# (payload size need not be a multiple of the vector size)
+			V = chunk(unpack_array('f', f.read(j)), cc)
 
 			log_level>1 and log( '--Number of vectors, indices:', len(V) )
 
@@ -258,9 +382,8 @@ def _load_geometry_data(f, log_level):
 		#
 		if s1 in ('0x7C4DEE82', '0x5C4AFC5C', '0x1C4AFC56') and 'V' in locals() and V != None:
 
-			i = unpack('<l', f.read(4))[0]
-			s = f.read(i*2)
-			I = unpack('<%iH'%i, s)
+			i = read_int(f)
+			I = unpack_array('H', f.read(i*2))
 
 			assert (len(I) == len(V)) or (len(I) == 0)
 			
@@ -280,30 +403,34 @@ def _load_geometry_data(f, log_level):
 
 	DATA_GROUPS = []
 
+	jobs = [] # (group, attribute, sub_index, decoder arguments)
+
 	# number of groups
 	#
-	group_count = unpack('<l', f.read(4))[0]
+	group_count = read_int(f)
 
 	log_level and log( 'Number of groups: %i' % group_count )
 
 	for k in xrange(group_count):
 
 		# add new group
-		group = DataGroup() ; DATA_GROUPS.append(group)
+		group = LazyDataGroup(use_numpy) if lazy else DataGroup() ; DATA_GROUPS.append(group)
 
 		# number of sections for this group
-		i = unpack('<l', f.read(4))[0]
+		i = read_int(f)
 
 		# section indices
-		s = f.read(i*2)
-		indices = unpack('<%iH'%i, s)
+		indices = unpack_array('H', f.read(i*2))
 
 		log_level and log( 'Group %i:' % k, indices )
 
 		# element count
-		group.count = unpack('<l', f.read(4))[0]
+		group.count = read_int(f)
 
-		for idx in indices:
+		present = set() # assigned attributes, (attribute, sub_index) for dVerts and dNorms
+		assigned = [] # (attribute, sub_index, type, raw_data, position in the group)
+
+		for pos, idx in enumerate(indices):
 			type, sub_index, data = SECTIONS[idx]
 			if type:
 				if type in ('T', 'dV', 'dN'):
@@ -314,70 +441,99 @@ def _load_geometry_data(f, log_level):
 					if sub_index != 0:
 						error( 'Error! Section sub_index is not zero. (Section type: %s)' % type )
 						return False
-				if   type == 'V': v = group.vertices
-				elif type == 'N': v = group.normals
-				elif type == 'B': v = group.bones
-				elif type == 'W': v = group.weights
-				elif type == 'X': v = group.tangents
-				elif type == 'M': v = group.mask
-				elif type == 'K': v = group.keys
-				elif type == 'VId': v = group.vertexID
-				elif type == 'RM': v = group.regionMask
-				elif type =='dV': v = group.dVerts[sub_index]
-				elif type =='dN': v = group.dNorms[sub_index]
-				elif type == 'T': v = group.tex_coords and group.tex_coords2
-				if v:
+				if type in ('dV', 'dN'):
+					attr = 'dVerts' if type == 'dV' else 'dNorms'
+					key = (attr, sub_index)
+				else:
+					attr = _GROUP_ATTRIBUTES[type]
+					if type == 'T' and attr in present:
+						attr = 'tex_coords2'
+					key = attr
+				if key in present:
 					error( 'Error! List is not empty.' )
-					error( 'Group: %i, Section index: %i, type: %s, sub_index: %i, element count: %i' % (len(DATA_GROUPS)-1, idx, type, sub_index, j) )
+					error( 'Group: %i, Section index: %i, type: %s, sub_index: %i, element count: %i' % (len(DATA_GROUPS)-1, idx, type, sub_index, data.count) )
 					return False
-				v.extend(data)
+				present.add(key)
+				assigned.append( (attr, sub_index, type, data, pos) )
 
 		# again number of sections (?)
-		j = unpack('<l', f.read(4))[0]
+		j = read_int(f)
 		assert j == i # ?
 
 		# validate rigging data
-		if group.bones and not group.weights:
+		if 'bones' in present and 'weights' not in present:
 			error( 'Error! Incorrect rigging data. (no weights)' )
 			return False
 
 		# validate morph data
-		i = sum(2**i for i, v in enumerate(group.dVerts) if v)
-		j = sum(2**j for j, v in enumerate(group.dNorms) if v)
+		i = sum(2**i for i in xrange(4) if ('dVerts', i) in present)
+		j = sum(2**j for j in xrange(4) if ('dNorms', j) in present)
 		if i not in (0, 1, 3, 7, 15):
 			error( 'Error! Invalid state of DiffVerts - %s' % format(i, '04b') )
 			return False
 		if j and j != i:
 			error( 'Error! Invalid state of DiffNorms - %s (DiffVerts - %s)' % (format(j, '04b'), format(i, '04b')) )
 			return False
-		if i and not group.keys:
+		if i and 'keys' not in present:
 			error( 'Error! There are DiffVerts, but no DiffKeys in the group %i.' % (len(DATA_GROUPS)-1) )
 			return False
 
 		# index mapping
 		#
-		i = unpack('<l', f.read(4))[0]
-		index_mapping1 = unpack('<%iH'%i, f.read(i*2))
-
-		i = unpack('<l', f.read(4))[0]
-		index_mapping2 = unpack('<%iH'%i, f.read(i*2))
-
-		i = unpack('<l', f.read(4))[0]
-		index_mapping3 = unpack('<%iH'%i, f.read(i*2))
-
-		# apply indexing
-		if index_mapping1: v =   group.vertices ; group.vertices   = [v[i] for i in index_mapping1]
-		if index_mapping2: v =    group.normals ; group.normals    = [v[i] for i in index_mapping2]
-		if index_mapping3: v = group.tex_coords ; group.tex_coords = [v[i] for i in index_mapping3]
+		index_mapping1 = _read_index_mapping(f, use_numpy)
+		index_mapping2 = _read_index_mapping(f, use_numpy)
+		index_mapping3 = _read_index_mapping(f, use_numpy)
+
+		# apply indexing; index mapping k applies to the k-th section
+		# of the group (see _build_sections)
+		index_mappings = (index_mapping1, index_mapping2, index_mapping3)
+
+		for attr, sub_index, type, data, pos in assigned:
+			mapping = index_mappings[pos] if pos < 3 and len(index_mappings[pos]) else None
+			if mapping is not None and max(mapping) >= data.count:
+				error( 'Error! Index mapping is out of range.' )
+				error( 'Group: %i, type: %s, sub_index: %i, element count: %i' % (len(DATA_GROUPS)-1, type, sub_index, data.count) )
+				return False
+			count = data.count if mapping is None else len(mapping)
+			if count != group.count:
+				# remapped data must match the group; unmapped data is kept as is
+				s = 'Group: %i, type: %s, sub_index: %i, element count: %i, group element count: %i' % (len(DATA_GROUPS)-1, type, sub_index, count, group.count)
+				if mapping is not None:
+					error( 'Error! Element count of the remapped section does not match the group.' )
+					error( s )
+					return False
+				log( 'Warning! Element count of the section does not match the group.' )
+				log( s )
+			if lazy:
+				group._add_section(attr, type, sub_index, data, mapping)
+			else:
+				jobs.append( (group, attr, sub_index, (type, data, use_numpy, mapping, bool(threads))) )
 
-		if index_mapping1 or index_mapping2 or index_mapping3:
-			assert not (group.bones or group.keys)
+		if any(map(len, index_mappings)):
 			log( '--Index mapping: (%i, %i, %i)' % (len(index_mapping1), len(index_mapping2), len(index_mapping3)) )
 
 		v = None
 
 	#<-
 
+	# decode sections
+	#
+	if threads and len(jobs) > 1:
+		with ThreadPoolExecutor(threads) as executor:
+			results = list(executor.map(lambda args: _decode_attribute(*args), [job[3] for job in jobs]))
+	else:
+		results = [_decode_attribute(*job[3]) for job in jobs]
+
+	for (group, attr, sub_index, args), data in zip(jobs, results):
+		if attr in ('dVerts', 'dNorms'):
+			getattr(group, attr)[sub_index] = data
+		else:
+			setattr(group, attr, data)
+			if attr == 'bones':
+				group.bone_counts = _influence_counts(data)
+
+	del jobs, results
+
 	#
 	# index groups (geometry parts)
 	#
@@ -386,7 +542,7 @@ def _load_geometry_data(f, log_level):
 
 	INDEX_GROUPS = []
 
-	index_group_count = unpack('<l', f.read(4))[0]
+	index_group_count = read_int(f)
 	
 	log_level and log( 'Number of index groups:', index_group_count )
 
@@ -394,7 +550,7 @@ def _load_geometry_data(f, log_level):
 
 		log_level and log( 'Index group # %i @ %08x' % (k, f.tell()) )
 
-		type, data_group_index = unpack('<2l', f.read(8))
+		type, data_group_index = read_struct(f, '<2l')
 		assert type == 2 # other primitives (if any), including 0-lines, are not supported
 
 		log_level>1 and log( '--Refers to group:', data_group_index )
@@ -404,7 +560,7 @@ def _load_geometry_data(f, log_level):
 		log_level>1 and log( '--Name: "%s"' % name )
 
 		# number of indices
-		i = unpack('<l', f.read(4))[0]
+		i = read_int(f)
 		j = i*2
 		assert i%3 == 0
 
@@ -413,20 +569,20 @@ def _load_geometry_data(f, log_level):
 		group.data_group_index = data_group_index
 
 		# read indices
-		group.indices = chunk(unpack('<%iH'%i, f.read(j)), 3)
+		group.indices = unpack_records('<3H', f.read(j))
 
 		log_level>1 and log( '--Number of indices: %i (%i triangles)' % (i, len(group.indices)) )
 
 		# flags (?)
 		s = f.read(4)
 		log_level>1 and log( '--Flags (?):', to_hex(s) )
-		group.flags = unpack('<L', s)[0]
+		group.flags = unpack_array('L', s)[0]
 
 		# bone indices (if any)
-		i = unpack('<l', f.read(4))[0]
+		i = read_int(f)
 		if i != 0:
 			s = f.read(i*2)
-			group.bones = unpack('<%iH'%i, s)
+			group.bones = unpack_array('H', s)
 			if log_level > 1:
 				if i <= 5:
 					log( '--Bone indices: %i' % i, group.bones )
@@ -442,18 +598,16 @@ def _load_geometry_data(f, log_level):
 
 	# inverse transforms
 	#
-	k = unpack('<l', f.read(4))[0]
+	k = read_int(f)
 	if k:
 		log_level and log( 'Inverse transforms (%i) @ %08x' % (k, f.tell()-4) )
-		inverse_transforms = []
-		for i in xrange(k):
-			inverse_transforms.append( (unpack('<4f', f.read(16)), unpack('<3f', f.read(12))) )
+		inverse_transforms = [(v[:4], v[4:]) for v in read_records(f, '<7f', k)]
 	else:
 		inverse_transforms = None
 
 	# morphs
 	#
-	k = unpack('<l', f.read(4))[0]
+	k = read_int(f)
 	if k:
 		log_level and log( 'Morphs / vertex animations (%i)' % k + (':' if log_level>1 else '') )
 		MORPH_NAMES = []
@@ -466,36 +620,36 @@ def _load_geometry_data(f, log_level):
 
 	# static bounding mesh
 	#
-	i = unpack('<l', f.read(4))[0]
+	i = read_int(f)
 	if i:
-		j = unpack('<l', f.read(4))[0]
+		j = read_int(f)
 		log_level and log( 'Static bounding mesh @ %08x' % (f.tell()-4) + (':' if log_level>1 else '') )
 		if log_level > 1:
 			log( '--Vertices:', i )
 			log( '--Indices:', j )
 
 		# read data
-		V = chunk(unpack('<%if'%(i*3), f.read(i*12)), 3)
-		I = chunk(unpack('<%iH'%j, f.read(j*2)), 3)
+		V = read_records(f, '<3f', i)
+		I = read_records(f, '<3H', j//3)
 		static_bmesh = (V, I)
 	else:
 		static_bmesh = None
 
 	# dynamic bounding mesh
 	#
-	i = unpack('<l', f.read(4))[0]
+	i = read_int(f)
 	if i:
 		log_level and log( 'Dynamic bounding mesh parts (%i)' % i + (':' if log_level>1 else '') )
 		dynamic_bmesh = []
 		for k in xrange(i):
 			offset = f.tell()
-			i = unpack('<l', f.read(4))[0]
+			i = read_int(f)
 			if i:
-				j = unpack('<l', f.read(4))[0]
+				j = read_int(f)
 
 				# read data
-				V = chunk(unpack('<%if'%(i*3), f.read(i*12)), 3)
-				I = chunk(unpack('<%iH'%j, f.read(j*2)), 3)
+				V = read_records(f, '<3f', i)
+				I = read_records(f, '<3H', j//3)
 				dynamic_bmesh.append((V, I))
 
 				log_level>1 and log( '--Part # %02i @ %08x -> vertices: %i, indices: %i' % (k, offset, len(V), len(I)) )
@@ -512,248 +666,769 @@ def _load_geometry_data(f, log_level):
 	return GeometryData(DATA_GROUPS, INDEX_GROUPS, inverse_transforms, MORPH_NAMES, static_bmesh, dynamic_bmesh)
 
 
+def _scan_geometry_data(f, log_level):
+
+	log_level and log( '//// Scanning GMDC...' )
+
+	info = GeometryInfo()
+
+	for rec in iter_geometry_records(f, payloads=False):
+		if type(rec) == SectionRecord:
+			info.sections.append( (rec.offset, rec.name, rec.count, rec.sub_index, rec.type_of_data, rec.size) )
+		elif type(rec) == DataGroupRecord:
+			info.data_groups.append( (rec.count, rec.section_indices, tuple(i for i, s in rec.index_mappings)) )
+		elif type(rec) == IndexGroupRecord:
+			info.index_groups.append( (rec.name, rec.data_group_index, rec.flags, rec.indices[0]//3, rec.bones[0]) )
+		else:
+			info.inverse_transform_count = rec.inverse_transforms[0]
+			info.morph_names = rec.morph_names
+			info.static_bmesh = rec.static_bmesh and rec.static_bmesh[:2]
+			if rec.dynamic_bmesh and any(rec.dynamic_bmesh):
+				info.dynamic_bmesh = [part and part[:2] for part in rec.dynamic_bmesh]
+
+	log_level and log( '//// Finished @ %08x' % f.tell() )
+
+	return info
+
+
+########################################
+##  Streaming
+########################################
+
+# Records yielded by iter_geometry_records(), in file order:
+# sections, data groups, index groups and then the remaining data.
+# Variable-length blocks are stored as (count, payload), where
+# payload is raw data (bytes or memoryview) or None if skipped.
+
+SectionRecord = namedtuple('SectionRecord', 'index offset name type count sub_index type_of_data unknown size payload indices')
+DataGroupRecord = namedtuple('DataGroupRecord', 'index section_indices count index_mappings')
+IndexGroupRecord = namedtuple('IndexGroupRecord', 'index primitive_type data_group_index name indices flags bones')
+TailRecord = namedtuple('TailRecord', 'offset inverse_transforms morph_names static_bmesh dynamic_bmesh')
+# TailRecord:
+# - offset: file offset of the tail (inverse transform count)
+# - inverse_transforms: (count, payload), 28 bytes per transform
+# - morph_names: list of string pairs or None
+# - static_bmesh: (vertex_count, index_count, payload) or None
+# - dynamic_bmesh: list of the same (or None for empty parts) or None
+
+def iter_geometry_records(f, payloads=True):
+
+	# f must be positioned at the beginning of the geometry data,
+	# i.e., right after the cSGResource block of cGeometryDataContainer;
+	# nothing is kept between records, so files of any size are streamed
+	# with constant memory
+
+	read_l = lambda: read_int(f)
+
+	if payloads:
+		read = lambda n: read_view(f, n)
+	else:
+		read = lambda n: f.seek(n, 1) and None
+
+	# sections
+	#
+	for k in xrange(read_l()):
+		offset = f.tell()
+		i = read_l()
+		s1, s2 = _SECTION_TYPES[f.read(4)]
+		sub_idx, type_of_data, unknown1, j = read_struct(f, '<4l')
+		payload = read(j)
+		n = read_l()
+		yield SectionRecord(k, offset, s1, s2, i, sub_idx, type_of_data, unknown1, j, payload, (n, read(n*2)))
+
+	# groups of data
+	#
+	for k in xrange(read_l()):
+		i = read_l()
+		indices = unpack_array('H', f.read(i*2))
+		count = read_l()
+		read_l() # again number of sections
+		mappings = []
+		for i in xrange(3):
+			i = read_l()
+			mappings.append( (i, read(i*2)) )
+		yield DataGroupRecord(k, indices, count, tuple(mappings))
+
+	# index groups
+	#
+	for k in xrange(read_l()):
+		primitive_type, data_group_index = read_struct(f, '<2l')
+		name = read_str(f)
+		i = read_l()
+		indices = (i, read(i*2))
+		flags = read_struct(f, '<L')[0]
+		i = read_l()
+		yield IndexGroupRecord(k, primitive_type, data_group_index, name, indices, flags, (i, read(i*2)))
+
+	# other
+	#
+	offset = f.tell()
+	k = read_l()
+	inverse_transforms = (k, read(k*28))
+
+	k = read_l()
+	morph_names = [(read_str(f), read_str(f)) for i in xrange(k)] or None
+
+	def read_bmesh():
+		i = read_l()
+		if i:
+			j = read_l()
+			return (i, j, read(i*12 + j*2))
+		return None
+
+	static_bmesh = read_bmesh()
+
+	k = read_l()
+	dynamic_bmesh = [read_bmesh() for i in xrange(k)] or None
+
+	yield TailRecord(offset, inverse_transforms, morph_names, static_bmesh, dynamic_bmesh)
+
+
+def write_geometry_records(f, records):
+
+	# counterpart of iter_geometry_records(); records may be dropped or
+	# replaced (e.g. record._replace(payload=...)), section sizes are
+	# computed from payloads, counts are patched afterwards (f must be seekable)
+
+	magic = dict((v[0], k) for k, v in _SECTION_TYPES.items())
+
+	blocks = [] # [(offset, count)]
+
+	def next_block():
+		blocks.append([f.tell(), 0])
+		f.write(b'\x00\x00\x00\x00') # count (patched)
+
+	def write_block(t):
+		f.write(pack('<l', t[0]))
+		if t[0]:
+			f.write(t[-1])
+
+	def write_bmesh(part):
+		if part:
+			f.write(pack('<2l', part[0], part[1]))
+			f.write(part[2])
+		else:
+			f.write(b'\x00\x00\x00\x00')
+
+	tail = None
+
+	for rec in records:
+		k = (SectionRecord, DataGroupRecord, IndexGroupRecord, TailRecord).index(type(rec))
+		while len(blocks) <= min(k, 2):
+			next_block()
+		assert len(blocks) == min(k, 2) + 1 and not tail, 'Records out of order'
+		if k < 3:
+			blocks[k][1]+= 1
+
+		if k == 0:
+			f.write(pack('<l', rec.count) + magic[rec.name])
+			f.write(pack('<4l', rec.sub_index, rec.type_of_data, rec.unknown, len(rec.payload)))
+			f.write(rec.payload)
+			write_block(rec.indices)
+
+		elif k == 1:
+			i = len(rec.section_indices)
+			f.write(pack('<l%iHll' % i, i, *(tuple(rec.section_indices) + (rec.count, i))))
+			for t in rec.index_mappings:
+				write_block(t)
+
+		elif k == 2:
+			f.write(pack('<2l', rec.primitive_type, rec.data_group_index))
+			write_str(f, rec.name)
+			write_block(rec.indices)
+			f.write(pack('<L', rec.flags))
+			write_block(rec.bones)
+
+		else:
+			tail = rec
+
+	while len(blocks) < 3:
+		next_block()
+
+	if tail:
+		write_block(tail.inverse_transforms)
+		names = tail.morph_names or ()
+		f.write(pack('<l', len(names)))
+		for s1, s2 in names:
+			write_str(f, s1)
+			write_str(f, s2)
+		write_bmesh(tail.static_bmesh)
+		parts = tail.dynamic_bmesh or ()
+		f.write(pack('<l', len(parts)))
+		for part in parts:
+			write_bmesh(part)
+	else:
+		f.write(b'\x00' * 16) # no transforms, morphs and bounding geometry
+
+	offset = f.tell()
+	for i, count in blocks:
+		f.seek(i)
+		f.write(pack('<l', count))
+	f.seek(offset)
+
+
+def decode_section(rec, use_numpy=False):
+
+	# data of SectionRecord, as returned by the loader
+
+	cc = 4 if rec.type in ('B', 'K', 'M', '4', '5') else rec.type_of_data + 1
+	t = {'4': 'VId', '5': 'RM'}.get(rec.type, rec.type)
+	return _decode_section(t, _SectionData(rec.offset, rec.payload, rec.count, cc), use_numpy)
+
+def encode_section(rec, data):
+
+	# new header and payload for the section of SectionRecord (indices are
+	# not included); data is a sequence of tuples, a (count, components)
+	# array or raw payload (bytes)
+
+	t = {'4': 'VId', '5': 'RM'}.get(rec.type, rec.type)
+	dword = t in ('B', 'K', 'M', 'VId', 'RM')
+	if isinstance(data, (bytes, bytearray, memoryview)):
+		payload = bytes(data)
+		type_of_data = rec.type_of_data
+		count = len(payload) // (4 if dword else (type_of_data+1)*4)
+	else:
+		payload = pack_rows('B' if dword else 'f', data)
+		type_of_data = 4 if dword else len(data[0])-1
+		count = len(data)
+	return pack('<l4s4l', count, _SECTION_MAGIC[t], rec.sub_index, type_of_data, rec.unknown, len(payload)) + payload
+
+
+_GROUP_ATTRIBUTES = {
+	'V': 'vertices', 'N': 'normals', 'T': 'tex_coords', 'B': 'bones', 'W': 'weights', 'X': 'tangents',
+	'M': 'mask', 'K': 'keys', 'VId': 'vertexID', 'RM': 'regionMask' }
+
+# raw section data (offset of the section header, payload, element count, component count)
+_SectionData = namedtuple('_SectionData', 'offset payload count cc')
+
+def _decode_section(type, raw_data, use_numpy):
+	offset, s, count, cc = raw_data
+	if type in ('B', 'K', 'M', 'VId', 'RM'):
+		return _decode_dwords(s, count, use_numpy)
+	return _decode_floats(s, count, cc, use_numpy)
+
+def _decode_attribute(type, raw_data, use_numpy, mapping=None, copy=False):
+	data = _decode_section(type, raw_data, use_numpy)
+	if mapping is not None:
+		data = _remap(data, mapping)
+	elif copy and is_array(data):
+		# own the memory instead of viewing the file buffer
+		data = data.copy()
+	return data
+
+def _decode_floats(s, count, cc, use_numpy):
+	if use_numpy:
+		return np.frombuffer(s, '<f4', count*cc).reshape(count, cc)
+	return unpack_records('<%if'%cc, s)
+
+def _decode_dwords(s, count, use_numpy):
+	# 4 bytes per element
+	if use_numpy:
+		return np.frombuffer(s, np.uint8, count*4).reshape(count, 4)
+	return unpack_records('4B', s)
+
+def _read_index_mapping(f, use_numpy):
+	i = read_int(f)
+	if use_numpy:
+		return np.frombuffer(f.read(i*2), '<u2', i)
+	return unpack_array('H', f.read(i*2))
+
+def _influence_counts(bones):
+	# number of bone indices per vertex, i.e., position of the first 0xff
+	if is_array(bones):
+		m = bones == 0xff
+		return np.where(m.any(1), m.argmax(1), 4).astype(np.uint8)
+	return [v.index(0xff) if 0xff in v else 4 for v in bones]
+
+def _remap(data, mapping):
+	if is_array(data):
+		# vectorized gather
+		return data.take(mapping, axis=0)
+	return [data[i] for i in mapping]
+
+def _group_to_lists(group):
+	# convert array-backed group (see use_numpy) to lists of tuples
+	to_list = lambda v: list(map(tuple, v.tolist())) if is_array(v) else v
+	for attr in _GROUP_ATTRIBUTES.values():
+		setattr(group, attr, to_list(getattr(group, attr)))
+	if is_array(group.bone_counts):
+		group.bone_counts = group.bone_counts.tolist()
+	group.tex_coords2 = to_list(group.tex_coords2)
+	group.dVerts = list(map(to_list, group.dVerts))
+	group.dNorms = list(map(to_list, group.dNorms))
+	if is_array(group.remap):
+		group.remap = group.remap.tolist()
+
+def _index_group_to_lists(group):
+	# convert array-backed index group to lists of tuples;
+	# per-corner data, i.e., (N, 3, cc) arrays, to lists of triples of tuples
+	for attr in ('indices', 'original_indices', 'tex_coords', 'tex_coords2'):
+		v = getattr(group, attr)
+		if is_array(v):
+			if v.ndim > 2:
+				v = [tuple(map(tuple, t)) for t in v.tolist()]
+			else:
+				v = list(map(tuple, v.tolist()))
+			setattr(group, attr, v)
+
+
 #-------------------------------------------------------------------------------
 
-def _rm_doubles(geometry):
+# per-vertex attributes of data group, other than texture coords, tangents and morphs
+_VERTEX_ATTRIBUTES = ('vertices', 'normals', 'bones', 'bone_counts', 'weights', 'keys', 'vertexID', 'regionMask')
 
-	for idx1, g1 in enumerate(geometry.data_groups):
+def _rm_doubles(geometry, tolerance=0.0, processes=None, remap=None):
+
+	# processes - search data groups in a pool of worker processes
+	# remap - { data_group_index -> remap table }
 
-		if g1.tex_coords:
+	remap = remap or {}
 
-			log( 'Processing data group # %i...' % idx1 )
+	jobs = [] # [(data_group_index, attributes)]
 
-			N = g1.normals or repeat(0)
-			B = g1.bones   or repeat(0)
-			W = g1.weights or repeat(0)
-			K = g1.keys    or repeat(0)
-			VId = g1.vertexID or repeat(0)
-			RM = g1.regionMask or repeat(0)
+	for idx1, g1 in enumerate(geometry.data_groups):
 
-			g1.mask = [] # remove deform mask
+		if len(g1.tex_coords):
 
 			# validate morph data
 			#
-			i = sum(2**i for i, v in enumerate(g1.dVerts) if v)
-			j = sum(2**j for j, v in enumerate(g1.dNorms) if v)
+			i = sum(2**i for i, v in enumerate(g1.dVerts) if len(v))
+			j = sum(2**j for j, v in enumerate(g1.dNorms) if len(v))
 
-			assert i in (0, 1, 3, 7, 15) and (j==0 or j==i) and (bool(i) == bool(g1.keys))
+			assert i in (0, 1, 3, 7, 15) and (j==0 or j==i) and (bool(i) == bool(len(g1.keys)))
 
-			dV = zip(*filter(bool, g1.dVerts)) or repeat(0)
-			dN = zip(*filter(bool, g1.dNorms)) or repeat(0)
+			# attributes that define a vertex (texture coords excluded)
+			data = [g1.vertices, g1.normals, g1.bones, g1.weights, g1.keys, g1.vertexID, g1.regionMask]
+			data = [v for v in data + g1.dVerts + g1.dNorms if len(v)]
+
+			if idx1 in remap:
+				data = None # replayed
+
+			jobs.append( (idx1, data) )
+
+	# search
+	#   indices[old_index] -> new_index
+	#   unique_verts[new_index] -> old_index (first occurrence)
+	#
+	search = [data for idx1, data in jobs if data is not None]
+	if processes and len(search) > 1:
+		with ProcessPoolExecutor(processes) as executor:
+			results = iter(list(executor.map(_find_doubles, search, repeat(tolerance))))
+	else:
+		results = (_find_doubles(data, tolerance) for data in search)
+	results = [_replay_remap(remap[idx1]) if data is None else next(results) for idx1, data in jobs]
 
-			unique_verts = {} # { vertex -> new_index }
-			indices = [] # indices[old_index] -> new_index
+	for (idx1, data), (indices, unique_verts) in zip(jobs, results):
 
-			# search
-			for vertex in zip(g1.vertices, N, B, W, K, VId, RM, dV, dN):
-				k = unique_verts.setdefault(vertex, len(unique_verts))
-				indices.append(k)
-			assert len(indices) == g1.count
+		g1 = geometry.data_groups[idx1]
 
-			unique_verts = [v for v, i in sorted(unique_verts.items(), key=lambda x: x[1])]
+		log( 'Processing data group # %i...' % idx1 )
 
-			log( '--Vertex count: %i -> %i' % (g1.count, len(unique_verts)) )
-			log( '--Updating data...' )
+		assert len(indices) == g1.count
 
-			for idx2, g2 in enumerate(geometry.index_groups):
+		g1.mask = [] # remove deform mask
 
-				if g2.data_group_index == idx1:
+		log( '--Vertex count: %i -> %i' % (g1.count, len(unique_verts)) )
+		log( '--Updating data...' )
 
-					log( '\x20\x20--Processing index group # %i...' % idx2 )
+		for idx2, g2 in enumerate(geometry.index_groups):
 
-					I = g2.indices
+			if g2.data_group_index == idx1:
 
-					# move texture coords to index group
-					T = g1.tex_coords
-					g2.tex_coords = [(T[i], T[j], T[k]) for i, j, k in I]
-					if g1.tex_coords2:
-						T = g1.tex_coords2
-						g2.tex_coords2 = [(T[i], T[j], T[k]) for i, j, k in I]
+				log( '\x20\x20--Processing index group # %i...' % idx2 )
 
-					# update indices
-					g2.indices = [(indices[i], indices[j], indices[k]) for i, j, k in I]
+				I = g2.indices
 
-					del T, I
+				# move texture coords to index group
+				g2.tex_coords = _gather_triangles(g1.tex_coords, I)
+				if len(g1.tex_coords2):
+					g2.tex_coords2 = _gather_triangles(g1.tex_coords2, I)
 
-			g1.count = len(unique_verts)
-			g1.tex_coords = []
-			g1.tex_coords2 = []
-			g1.tangents = []
+				# update indices
+				g2.original_indices = I
+				g2.indices = _gather_triangles(indices, I)
 
-			g1.vertices, N, B, W, K, VId, RM, dV, dN = map(list, zip(*unique_verts))
-			del unique_verts, indices
+				del I
 
-			# update data
-			if g1.normals : g1.normals = N
-			if g1.bones   : g1.bones   = B
-			if g1.weights : g1.weights = W
-			if g1.keys    : g1.keys    = K
-			if g1.vertexID    : g1.vertexID    = VId
-			if g1.regionMask    : g1.regionMask    = RM
+		g1.count = len(unique_verts)
+		g1.tex_coords = []
+		g1.tex_coords2 = []
+		g1.tangents = []
+		g1.remap = indices
 
-			# pad with empty lists
-			if any(g1.dVerts):
-				dV = map(list, zip(*dV)) + [[], [], []]
-				g1.dVerts = dV[:4]
-			if any(g1.dNorms):
-				dN = map(list, zip(*dN)) + [[], [], []]
-				g1.dNorms = dN[:4]
+		# update data; all attributes are fetched first, since a lazy group
+		# derives bone_counts from bones (see LazyDataGroup)
+		for attr, v in [(attr, getattr(g1, attr)) for attr in _VERTEX_ATTRIBUTES]:
+			if len(v):
+				setattr(g1, attr, _take(v, unique_verts))
+		g1.dVerts = [_take(v, unique_verts) if len(v) else [] for v in g1.dVerts]
+		g1.dNorms = [_take(v, unique_verts) if len(v) else [] for v in g1.dNorms]
 
-			del N, B, W, K, VId, RM, dV, dN
+		del data, indices, unique_verts
 
 	#<- data_groups
 
+def _replay_remap(indices):
+	# returns (indices, unique_verts) as _find_doubles
+	if is_array(indices):
+		count = indices.max() + 1 if len(indices) else 0
+		first = np.full(count, len(indices), np.intp)
+		np.minimum.at(first, indices, np.arange(len(indices)))
+		return indices, first
+	first = {}
+	for i, k in enumerate(indices):
+		first.setdefault(k, i)
+	return indices, [first[k] for k in range(len(first))]
+
+def _restore_doubles(geometry):
+
+	for idx1, g1 in enumerate(geometry.data_groups):
+
+		if len(g1.remap):
+
+			log( 'Restoring data group # %i...' % idx1 )
+
+			remap = g1.remap
+			count = len(remap)
+
+			log( '--Vertex count: %i -> %i' % (g1.count, count) )
+
+			# vertex data
+			for attr, v in [(attr, getattr(g1, attr)) for attr in _VERTEX_ATTRIBUTES]:
+				if len(v):
+					setattr(g1, attr, _take(v, remap))
+			g1.dVerts = [_take(v, remap) if len(v) else [] for v in g1.dVerts]
+			g1.dNorms = [_take(v, remap) if len(v) else [] for v in g1.dNorms]
+
+			# move texture coords back from index groups
+			T1, T2 = None, None
+			for g2 in geometry.index_groups:
+				if g2.data_group_index == idx1 and g2.original_indices is not None:
+					I = g2.original_indices
+					T1 = _scatter_triangles(T1, g2.tex_coords, I, count)
+					if g2.tex_coords2 is not None and len(g2.tex_coords2):
+						T2 = _scatter_triangles(T2, g2.tex_coords2, I, count)
+					g2.indices = I
+					g2.original_indices = None
+					g2.tex_coords = None
+					g2.tex_coords2 = None
+
+			g1.count = count
+			g1.tex_coords = T1 if T1 is not None else []
+			g1.tex_coords2 = T2 if T2 is not None else []
+			g1.remap = []
+
+	#<- data_groups
+
+def _scatter_triangles(data, T, I, count):
+	# reverse of _gather_triangles: data[i], data[j], data[k] = t for t, (i, j, k) in zip(T, I)
+	if is_array(T):
+		T = T.reshape(-1, T.shape[-1])
+		if data is None:
+			data = np.zeros((count, T.shape[1]), T.dtype)
+		data[np.asarray(I, np.intp).reshape(-1)] = T
+		return data
+	if data is None:
+		data = [(0.0, 0.0)] * count # unreferenced vertices
+	for tri, t in zip(I, T):
+		for i, uv in zip(tri, t):
+			data[i] = uv
+	return data
+
+def _find_doubles(data, tolerance):
+	# array-backed groups (see use_numpy) are searched with numpy
+	if tolerance > 0:
+		return _weld_vertices(data, tolerance)
+	if np is not None and all(map(is_array, data)):
+		return _unique_vertices_np(data)
+	return _unique_vertices(data)
+
+def _unique_vertices(data):
+	unique_verts = {} # { vertex -> new_index }
+	indices = []
+	first = []
+	for i, vertex in enumerate(zip(*data)):
+		k = unique_verts.setdefault(vertex, len(unique_verts))
+		if k == len(first):
+			first.append(i)
+		indices.append(k)
+	return indices, first
+
+def _unique_vertices_np(data):
+	# vertex attributes are packed into one row of bytes per vertex
+	columns = []
+	for a in data:
+		if a.dtype.kind == 'f':
+			a = a + a.dtype.type(0) # -0.0 -> 0.0
+		columns.append(np.ascontiguousarray(a).view(np.uint8).reshape(len(a), -1))
+	rows = np.hstack(columns)
+	rows = rows.view(np.dtype((np.void, rows.shape[1]))).ravel()
+	_, first, inverse = np.unique(rows, return_index=True, return_inverse=True)
+	# keep order of first occurrence
+	order = np.argsort(first)
+	rank = np.empty_like(order)
+	rank[order] = np.arange(len(order))
+	return rank[inverse.ravel()], first[order]
+
+def _weld_vertices(data, tolerance):
+	# data[0] - vertex coords
+	# vertices are put into a uniform grid (cell size = tolerance);
+	# a match can only be found in the same or adjacent cells
+	rows = zip(*(v.tolist() if is_array(v) else v for v in data))
+	inv = 1.0 / tolerance
+	grid = {} # { cell -> [new_index] }
+	offsets = list(product((0, -1, 1), repeat=3))
+	indices = []
+	first = []
+	for i, vertex in enumerate(rows):
+		x, y, z = (int(floor(c*inv)) for c in vertex[0])
+		k = None
+		for dx, dy, dz in offsets:
+			for j in grid.get((x+dx, y+dy, z+dz), ()):
+				if _is_close(rows[first[j]], vertex, tolerance):
+					k = j
+					break
+			if k is not None:
+				break
+		if k is None:
+			k = len(first)
+			first.append(i)
+			grid.setdefault((x, y, z), []).append(k)
+		indices.append(k)
+	return indices, first
+
+def _is_close(v1, v2, tolerance):
+	# integer components (bones, keys, etc.) must match exactly
+	for a, b in zip(v1, v2):
+		for x, y in zip(a, b):
+			if x != y and (isinstance(x, int) or abs(x - y) > tolerance):
+				return False
+	return True
+
+def _gather_triangles(data, I):
+	# [(data[i], data[j], data[k]) for i, j, k in I]
+	# arrays are gathered at once; (N, 3, cc) arrays are kept,
+	# index triples are converted to a list of tuples
+	if is_array(data):
+		a = data[np.asarray(I, np.intp).reshape(-1, 3)]
+		return a if a.ndim > 2 else list(map(tuple, a.tolist()))
+	return [(data[i], data[j], data[k]) for i, j, k in I]
+
+def _take(data, index):
+	if is_array(data):
+		return data[index]
+	return [data[i] for i in index]
+
 
 ########################################
 ##  Exporter
 ########################################
 
-def create_gmdc_file(filename, sg_resource_name, geometry):
+_FILE_HEADER = b'\x01\x00\xff\xff\x00\x00\x00\x00\x01\x00\x00\x00\x87\x86\x4F\xAC' # no linked resources, 1 node
+
+def create_gmdc_file(filename, sg_resource_name, geometry, preallocate=False, dedup=False, index_mapping=False):
+
+	# preallocate - build the whole file in memory (see pack_gmdc_file)
+	#   and write it at once
+	# dedup - store identical sections once; data groups share them
+	# index_mapping - store unique vertices, normals and texture coords
+	#   with index mappings, where it makes data smaller (only for groups
+	#   that have no other attributes, e.g., static meshes)
+
+	if preallocate:
+		buf = pack_gmdc_file(sg_resource_name, geometry, dedup, index_mapping)
+		with open(filename, 'wb') as f:
+			f.write(buf)
+		return
 
 	node = GeometryDataContainer(0)
 	node.sg_resource_name = sg_resource_name
-	node.geometry = geometry
 
 	with open(filename, 'wb') as f:
-		f.write(b'\x01\x00\xff\xff\x00\x00\x00\x00\x01\x00\x00\x00\x87\x86\x4F\xAC')
-		node.write(f)
+		f.write(_FILE_HEADER)
+		node._write_header(f)
+		_write_geometry_data(f, geometry, dedup, index_mapping)
 
 	del node
 
+def pack_gmdc_file(sg_resource_name, geometry, dedup=False, index_mapping=False):
 
-def _write_geometry_data(f, geometry):
+	# returns GMDC file as bytearray; the exact size is computed first,
+	# then data is packed into the preallocated buffer
 
-	#
-	# build sections
-	#
+	node = GeometryDataContainer(0)
+	node.sg_resource_name = sg_resource_name
+
+	f = io.BytesIO()
+	f.write(_FILE_HEADER)
+	node._write_header(f)
+
+	return _pack_geometry_data(geometry, f.getvalue(), dedup, index_mapping)
+
+
+def _build_sections(geometry, dedup=False, index_mapping=False):
+
+	# returns sections [(type, sub_index, data, payload)], [group_index] -> (section_indices)
+	# and [group_index] -> (index_mapping1, index_mapping2, index_mapping3);
+	# payload is packed data (only if dedup) or None
 
 	SECTIONS = []
 
 	group_section_indices = [] # [group_index] -> (section_indices)
+	group_index_mappings = [] # [group_index] -> (index mappings)
 
 	for group in geometry.data_groups:
 		indices = [len(SECTIONS)]
 		SECTIONS.append(('V', 0, group.vertices))
-		if group.normals:
+		if len(group.normals):
 			indices.append(len(SECTIONS))
 			SECTIONS.append(('N', 0, group.normals))
-		if group.tex_coords:
+		if len(group.tex_coords):
 			indices.append(len(SECTIONS))
 			SECTIONS.append(('T', 0, group.tex_coords))
-			if group.tex_coords2:
+			if len(group.tex_coords2):
 				indices.append(len(SECTIONS))
 				SECTIONS.append(('T', 1, group.tex_coords2))
 
-		if group.bones:
+		# arrays (see use_numpy in the loader) are already aligned
+
+		if len(group.bones):
 			i = len(SECTIONS)
 			indices+= [i, i+1]
 
-			# align bone index tuples
-			v = [(b + (0xff, 0xff, 0xff, 0xff))[:4] for b in group.bones]
-			SECTIONS.append(('B', 0, v))
+			# bone indices are packed
+			SECTIONS.append(('B', 0, group.bones))
 
 			# align bone weight tuples (length <= 3)
-			k = min(3, max(map(len, group.weights)))
-			v = [(w + (0.0, 0.0, 0.0))[:k] for w in group.weights]
+			if is_array(group.weights):
+				v = group.weights
+			else:
+				k = min(3, max(map(len, group.weights)))
+				v = [(w + (0.0, 0.0, 0.0))[:k] for w in group.weights]
 			SECTIONS.append(('W', 0, v))
 
-		if group.tangents:
+		if len(group.tangents):
 			indices.append(len(SECTIONS))
 			SECTIONS.append(('X', 0, group.tangents))
 		
-		if group.vertexID:
+		if len(group.vertexID):
 			indices.append(len(SECTIONS))
+			SECTIONS.append(('VId', 0, group.vertexID))
 
-			# align tuples
-			v = [(vid + (0xff, 0xff, 0xff, 0xff))[:4] for vid in group.vertexID]
-			SECTIONS.append(('VId', 0, v))
-
-		if group.regionMask:
+		if len(group.regionMask):
 			indices.append(len(SECTIONS))
+			SECTIONS.append(('RM', 0, group.regionMask))
 
-			# align tuples
-			v = [(rm + (0xff, 0xff, 0xff, 0xff))[:4] for rm in group.regionMask]
-			SECTIONS.append(('RM', 0, v))
-
-		if group.keys:
+		if len(group.keys):
 			# keys
 			indices.append(len(SECTIONS))
 			# get aligned key index tuples
-			v = [(k + (0, 0, 0, 0))[:4] for k in group.keys]
+			v = group.keys if is_array(group.keys) else [(k + (0, 0, 0, 0))[:4] for k in group.keys]
 			SECTIONS.append(('K', 0, v))
 
 			# validate morph data
-			i = sum(2**i for i, v in enumerate(group.dVerts) if v)
-			j = sum(2**j for j, v in enumerate(group.dNorms) if v)
+			i = sum(2**i for i, v in enumerate(group.dVerts) if len(v))
+			j = sum(2**j for j, v in enumerate(group.dNorms) if len(v))
 
 			assert i in (1, 3, 7, 15) and (j==0 or j==i)
 
 			# dVerts
-			k = sum(map(bool, group.dVerts))
+			k = sum(1 for v in group.dVerts if len(v))
 			i = len(SECTIONS)
 			indices+= range(i, i+k)
 			for i in xrange(k):
 				SECTIONS.append(('dV', i, group.dVerts[i]))
 
 			# dNorms
-			k = sum(map(bool, group.dNorms))
+			k = sum(1 for v in group.dNorms if len(v))
 			i = len(SECTIONS)
 			indices+= range(i, i+k)
 			for i in xrange(k):
 				SECTIONS.append(('dN', i, group.dNorms[i]))
 
-		if group.mask:
+		if len(group.mask):
 			indices.append(len(SECTIONS))
 			SECTIONS.append(('M', 0, group.mask))
 
 		group_section_indices.append(tuple(indices))
 
+		# index mapping k applies to k-th section of the group,
+		# i.e., only vertices, normals and texture coords are indexed
+		mappings = [(), (), ()]
+		if index_mapping and len(group.vertices):
+			if [SECTIONS[i][0] for i in indices] == ['V', 'N', 'T'][:len(indices)]:
+				for k, i in enumerate(indices):
+					type, sub_index, data = SECTIONS[i]
+					rows, mapping = _index_rows(data)
+					cc = len(data[0])
+					if len(rows)*cc*4 + len(mapping)*2 < len(data)*cc*4:
+						SECTIONS[i] = (type, sub_index, rows)
+						mappings[k] = mapping
+		group_index_mappings.append(tuple(mappings))
+
+	if dedup:
+		SECTIONS, group_section_indices = _dedup_sections(SECTIONS, group_section_indices)
+	else:
+		SECTIONS = [t + (None,) for t in SECTIONS]
+
+	return SECTIONS, group_section_indices, group_index_mappings
+
+def _index_rows(data):
+	# unique rows and [index] -> unique_index
+	if is_array(data):
+		rows, mapping = np.unique(data, axis=0, return_inverse=True)
+		return rows, tuple(mapping.ravel().tolist())
+	d = {}
+	mapping = tuple(d.setdefault(v, len(d)) for v in data)
+	return list(d), mapping
+
+def _dedup_sections(SECTIONS, group_section_indices):
+
+	# sections with the same header and payload are stored once
+
+	unique_sections = []
+	new_indices = [] # [old_index] -> new_index
+	d = {} # { (type, sub_index, type_of_data, payload) -> new_index }
+
+	for type, sub_index, data in SECTIONS:
+		if type in ('B', 'K', 'M', 'VId', 'RM'):
+			payload = pack_rows('B', data)
+			key = (type, sub_index, 4, payload)
+		else:
+			payload = pack_rows('f', data)
+			key = (type, sub_index, len(data[0]), payload)
+		i = d.setdefault(key, len(unique_sections))
+		if i == len(unique_sections):
+			unique_sections.append( (type, sub_index, data, payload) )
+		new_indices.append(i)
+
+	group_section_indices = [tuple(new_indices[i] for i in t) for t in group_section_indices]
+
+	return unique_sections, group_section_indices
+
+
+def _write_geometry_data(f, geometry, dedup=False, index_mapping=False):
+
+	SECTIONS, group_section_indices, group_index_mappings = _build_sections(geometry, dedup, index_mapping)
+
 	#
 	# write sections
 	#
 
 	f.write(pack('<l', len(SECTIONS))) # number of sections
 
-	for type, sub_index, data in SECTIONS:
-
-		s = pack('<l', len(data)) # number of elements
-		cc = len(data[0]) # component count
-
-		# magic number
-		if   type == 'V': s+= b'\x81\x07\x83\x5B'
-		elif type == 'N': s+= b'\x8B\x07\x83\x3B'
-		elif type == 'T': s+= b'\xAB\x07\x83\xBB'
-		elif type == 'B': s+= b'\x11\x01\xD7\xFB'
-		elif type == 'W': s+= b'\x05\x01\xD7\x3B'
-		elif type == 'X': s+= b'\xA0\x2B\xD9\x89'
-		elif type =='dV': s+= b'\xE1\xCF\xF2\x5C'
-		elif type =='dN': s+= b'\x6A\x3A\x6F\xCB'
-		elif type == 'K': s+= b'\xDC\xCF\xF2\xDC'
-		elif type == 'M': s+= b'\x95\x07\x83\xDB'
-		elif type == 'VId' : s+= b'\xC3\x13\x41\x11'
-		elif type == 'RM' : s+= b'\xCD\x13\x41\x11'
-
-		s+= pack('<l', sub_index)
+	for type, sub_index, data, s in SECTIONS:
 
+		# each section is serialized into one buffer
 		if type in ('B', 'K', 'M', 'VId', 'RM'):
-			s+= b'\x04\x00\x00\x00' # 4 bytes
-			s+= b'\x03\x00\x00\x00' # unknown
-			s+= pack('<l', len(data)*4) # size in bytes
-			fmt = '4B'
+			if s is None: s = pack_rows('B', data)
+			type_of_data = 4 # 4 bytes
 		else:
-			s+= pack('<l', cc-1)    # floats (1, 2 or 3)
-			s+= b'\x03\x00\x00\x00' # unknown
-			s+= pack('<l', len(data)*4*cc) # size in bytes
-			fmt = '<%if'%cc
-
-		# header
-		f.write(s)
-
-		# data
-		for t in data:
-			f.write(pack(fmt, *t))
+			if s is None: s = pack_rows('f', data)
+			type_of_data = len(data[0])-1 # floats (1, 2 or 3)
 
-		f.write(b'\x00\x00\x00\x00') # no indices
+		# element count, magic number, sub_index, type of data, unknown, size in bytes, data, no indices
+		f.write(pack('<l4s4l', len(data), _SECTION_MAGIC[type], sub_index, type_of_data, 3, len(s)) + s + b'\x00\x00\x00\x00')
 
 	#
 	# groups
@@ -762,12 +1437,13 @@ def _write_geometry_data(f, geometry):
 	# number of groups
 	f.write(pack('<l', len(group_section_indices)))
 
-	for t, group in zip(group_section_indices, geometry.data_groups):
+	for t, mappings, group in zip(group_section_indices, group_index_mappings, geometry.data_groups):
 		f.write(pack('<l', len(t)))         # number of sections
 		f.write(pack('<%iH'%len(t), *t))    # section indices
 		f.write(pack('<l', len(group.vertices))) # number of elements in section
 		f.write(pack('<l', len(t)))         # again number of sections (?)
-		f.write(b'\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00') # no index mapping
+		for mapping in mappings:
+			f.write(pack('<l', len(mapping)) + pack_array('H', mapping)) # index mapping (if any)
 
 	#
 	# indices
@@ -780,15 +1456,12 @@ def _write_geometry_data(f, geometry):
 		f.write(b'\x02\x00\x00\x00') # triangles
 		f.write(pack('<l', group.data_group_index))
 		write_str(f, group.name)
-		f.write(pack('<l', len(group.indices)*3))
-
-		for t in group.indices:
-			f.write(pack('<3H', *t))
+		f.write(pack('<l', len(group.indices)*3) + pack_rows('H', group.indices))
 
 		f.write(pack('<L', group.flags))
 
 		if group.bones:
-			f.write(pack('<l%iH'%len(group.bones), len(group.bones), *group.bones))
+			f.write(pack('<l', len(group.bones)) + pack_array('H', group.bones))
 		else:
 			f.write(b'\x00\x00\x00\x00') # no bones
 
@@ -798,9 +1471,7 @@ def _write_geometry_data(f, geometry):
 
 	if geometry.inverse_transforms:
 		f.write(pack('<l', len(geometry.inverse_transforms)))
-		for rot, loc in geometry.inverse_transforms:
-			f.write(pack('<4f', *rot))
-			f.write(pack('<3f', *loc))
+		f.write(pack_rows('f', [tuple(rot) + tuple(loc) for rot, loc in geometry.inverse_transforms]))
 	else:
 		f.write(b'\x00\x00\x00\x00') # no transforms (static mesh)
 
@@ -822,14 +1493,7 @@ def _write_geometry_data(f, geometry):
 
 	if geometry.static_bmesh and geometry.static_bmesh[0]:
 		V, I = geometry.static_bmesh
-		f.write(pack('<l', len(V)))
-		f.write(pack('<l', len(I)*3))
-
-		for t in V:
-			f.write(pack('<3f', *t))
-
-		for t in I:
-			f.write(pack('<3H', *t))
+		f.write(pack('<2l', len(V), len(I)*3) + pack_rows('f', V) + pack_rows('H', I))
 	else:
 		f.write(b'\x00\x00\x00\x00')
 
@@ -840,16 +1504,109 @@ def _write_geometry_data(f, geometry):
 		for part in geometry.dynamic_bmesh:
 			if part:
 				V, I = part
-				f.write(pack('<l', len(V)))
-				f.write(pack('<l', len(I)*3))
-
-				for t in V:
-					f.write(pack('<3f', *t))
-
-				for t in I:
-					f.write(pack('<3H', *t))
+				f.write(pack('<2l', len(V), len(I)*3) + pack_rows('f', V) + pack_rows('H', I))
 			else:
 				f.write(b'\x00\x00\x00\x00')
 	else:
 		f.write(b'\x00\x00\x00\x00')
 
+
+def _pack_geometry_data(geometry, header=b'', dedup=False, index_mapping=False):
+
+	SECTIONS, group_section_indices, group_index_mappings = _build_sections(geometry, dedup, index_mapping)
+
+	encode = lambda s: s.encode('latin_1')
+
+	sections = [] # (type, sub_index, data, payload, type code, type of data, size in bytes)
+	for type, sub_index, data, payload in SECTIONS:
+		if type in ('B', 'K', 'M', 'VId', 'RM'):
+			sections.append( (type, sub_index, data, payload, 'B', 4, len(data)*4) )
+		else:
+			cc = len(data[0])
+			sections.append( (type, sub_index, data, payload, 'f', cc-1, len(data)*cc*4) )
+
+	names = [encode(group.name) for group in geometry.index_groups]
+	inverse_transforms = [tuple(rot) + tuple(loc) for rot, loc in geometry.inverse_transforms or ()]
+	morph_names = [(encode(s1), encode(s2)) for s1, s2 in geometry.morph_names or ()]
+	static_bmesh = geometry.static_bmesh if geometry.static_bmesh and geometry.static_bmesh[0] else None
+	dynamic_bmesh = geometry.dynamic_bmesh or ()
+
+	bmesh_size = lambda part: 8 + len(part[0])*12 + len(part[1])*6 if part else 4
+
+	#
+	# compute size
+	#
+
+	size = len(header)
+	size+= 4 + sum(28 + t[6] for t in sections)
+	size+= 4 + sum(24 + len(t)*2 + sum(map(len, mappings))*2 for t, mappings in zip(group_section_indices, group_index_mappings))
+	size+= 4 + sum(21 + len(name) + len(group.indices)*6 + len(group.bones or ())*2 for group, name in zip(geometry.index_groups, names))
+	size+= 4 + len(inverse_transforms)*28
+	size+= 4 + sum(2 + len(s1) + len(s2) for s1, s2 in morph_names)
+	size+= bmesh_size(static_bmesh)
+	size+= 4 + sum(map(bmesh_size, dynamic_bmesh))
+
+	#
+	# pack data
+	#
+
+	buf = bytearray(size)
+	w = BufferWriter(buf)
+	w.write(header)
+
+	# sections
+	w.pack('<l', len(sections))
+	for type, sub_index, data, payload, code, type_of_data, j in sections:
+		w.pack('<l4s4l', len(data), _SECTION_MAGIC[type], sub_index, type_of_data, 3, j)
+		if payload is None:
+			w.pack_rows(code, data)
+		else:
+			w.write(payload)
+		w.pack('<l', 0) # no indices
+
+	# groups
+	w.pack('<l', len(group_section_indices))
+	for t, mappings, group in zip(group_section_indices, group_index_mappings, geometry.data_groups):
+		i = len(t)
+		w.pack('<l%iHll' % i, i, *(t + (len(group.vertices), i)))
+		for mapping in mappings:
+			w.pack('<l%iH' % len(mapping), len(mapping), *mapping) # index mapping (if any)
+
+	# indices
+	w.pack('<l', len(geometry.index_groups))
+	for group, name in zip(geometry.index_groups, names):
+		w.pack('<2lB', 2, group.data_group_index, len(name))
+		w.write(name)
+		w.pack('<l', len(group.indices)*3)
+		w.pack_rows('H', group.indices)
+		bones = group.bones or ()
+		w.pack('<Ll%iH' % len(bones), group.flags, len(bones), *bones)
+
+	# inverse transforms
+	w.pack('<l', len(inverse_transforms))
+	w.pack_rows('f', inverse_transforms)
+
+	# morph names
+	w.pack('<l', len(morph_names))
+	for s1, s2 in morph_names:
+		w.pack('B', len(s1)) ; w.write(s1)
+		w.pack('B', len(s2)) ; w.write(s2)
+
+	# bounding geometry
+	def pack_bmesh(part):
+		if part:
+			V, I = part
+			w.pack('<2l', len(V), len(I)*3)
+			w.pack_rows('f', V)
+			w.pack_rows('H', I)
+		else:
+			w.pack('<l', 0)
+
+	pack_bmesh(static_bmesh)
+	w.pack('<l', len(dynamic_bmesh))
+	for part in dynamic_bmesh:
+		pack_bmesh(part)
+
+	assert w.tell() == size
+
+	return buf
@@ -20,8 +20,9 @@
 # THE SOFTWARE.
 #-------------------------------------------------------------------------------
 
-from struct import pack, unpack
+from struct import pack
 from ._common import *
+from ._codec import *
 
 ########################################
 ##  Base node class
@@ -88,8 +89,17 @@ class _SGNode(object):
 	def __repr__(self):
 		return self.__str__()
 
+	def _read_check_header(self, f, header):
+		# header is a length-prefixed class name followed by 8 bytes
+		s = read_view(f, len(header))
+		if s != header:
+			error( 'Error! %s header:' % header[1:1+header[0]].decode('latin_1'), to_hex(s) )
+			error( '%#x' % f.tell() )
+			return False
+		return True
+
 	def _read_check_version(self, f, supported):
-		self.version = unpack('<l', f.read(4))[0]
+		self.version = read_int(f)
 		try:
 			assert self.version == supported or self.version in supported
 			b = True
@@ -106,48 +116,26 @@ class _SGNode(object):
 	#
 
 	def _read_cSGResource(self, f):
-		s = f.read(20)
-		if s != b'\x0bcSGResource\x00\x00\x00\x00\x02\x00\x00\x00':
-			error( 'Error! cSGResource header:', to_hex(s) )
-			error( '%#x' % f.tell() )
-			return False
+		if not self._read_check_header(f, b'\x0bcSGResource\x00\x00\x00\x00\x02\x00\x00\x00'): return False
 		self.sg_resource_name = read_str(f)
 		return True
 
 	def _read_cCompositionTreeNode(self, f):
-		s = f.read(29)
-		if s != b'\x14cCompositionTreeNode\x00\x00\x00\x00\x0b\x00\x00\x00':
-			error( 'Error! cCompositionTreeNode header:', to_hex(s) )
-			error( '%#x' % f.tell() )
-			return False
+		if not self._read_check_header(f, b'\x14cCompositionTreeNode\x00\x00\x00\x00\x0b\x00\x00\x00'): return False
 		if not self._read_cObjectGraphNode(f): return False
-		i = unpack('<l', f.read(4))[0]
-		s = f.read(i*6)
-		v = unpack('<'+'BBl'*(len(s)//6), s)
-		self.child_nodes = chunk(v, 3)
+		self.child_nodes = read_records(f, '<BBl', read_int(f))
 		return True
 
 	def _read_cObjectGraphNode(self, f):
-		s = f.read(25)
-		if s != b'\x10cObjectGraphNode\x00\x00\x00\x00\x04\x00\x00\x00':
-			error( 'Error! cObjectGraphNode header:', to_hex(s) )
-			error( '%#x' % f.tell() )
-			return False
-		i = unpack('<l', f.read(4))[0]
-		s = f.read(i*6)
-		v = unpack('<'+'BBl'*(len(s)//6), s)
-		self.extensions = chunk(v, 3)
+		if not self._read_check_header(f, b'\x10cObjectGraphNode\x00\x00\x00\x00\x04\x00\x00\x00'): return False
+		self.extensions = read_records(f, '<BBl', read_int(f))
 		self.obj_string = read_str(f)
 		return True
 
 	def _read_cRenderableNode(self, f):
-		s = f.read(24)
-		if s != b'\x0fcRenderableNode\x00\x00\x00\x00\x05\x00\x00\x00':
-			error( 'Error! cRenderableNode header:', to_hex(s) )
-			error( '%#x' % f.tell() )
-			return False
+		if not self._read_check_header(f, b'\x0fcRenderableNode\x00\x00\x00\x00\x05\x00\x00\x00'): return False
 		if not self._read_cBoundedNode(f): return False
-		self.R_number = unpack('<BBl', f.read(6))
+		self.R_number = read_struct(f, '<BBl')
 		j = self.R_number[2]
 		v = []
 		while j:
@@ -158,32 +146,21 @@ class _SGNode(object):
 		return True
 
 	def _read_cBoundedNode(self, f):
-		s = f.read(21)
-		if s != b'\x0ccBoundedNode\x00\x00\x00\x00\x05\x00\x00\x00':
-			error( 'Error! cBoundedNode header:', to_hex(s) )
-			error( '%#x' % f.tell() )
-			return False
+		if not self._read_check_header(f, b'\x0ccBoundedNode\x00\x00\x00\x00\x05\x00\x00\x00'): return False
 		return self._read_cTransformNode(f)
 
 	def _read_cTransformNode(self, f):
-		s = f.read(23)
-		if s != b'\x0ecTransformNode\x62\x64\x24\x65\x07\x00\x00\x00':
-			error( 'Error! cTransformNode header:', to_hex(s) )
-			error( '%#x' % f.tell() )
-			return False
+		if not self._read_check_header(f, b'\x0ecTransformNode\x62\x64\x24\x65\x07\x00\x00\x00'): return False
 		if not self._read_cCompositionTreeNode(f): return False
-		self.T_loc = unpack('<3f', f.read(12))
-		self.T_rot = unpack('<4f', f.read(16))
-		i = unpack('<l', f.read(4))[0]
+		v = read_struct(f, '<7fl')
+		self.T_loc = v[:3]
+		self.T_rot = v[3:7]
+		i = v[7]
 		self.T_bone_index = i if i!=0x7fffffff else None
 		return True
 
 	def _read_cExtension_h(self, f):
-		s = f.read(19)
-		if s != b'\x0acExtension\x00\x00\x00\x00\x03\x00\x00\x00':
-			error( 'Error! cExtension header:', to_hex(s) )
-			error( '%#x' % f.tell() )
-			return False
+		if not self._read_check_header(f, b'\x0acExtension\x00\x00\x00\x00\x03\x00\x00\x00'): return False
 		return True
 
 	#
@@ -197,15 +174,11 @@ class _SGNode(object):
 	def _write_cCompositionTreeNode(self, f):
 		f.write(b'\x14cCompositionTreeNode\x00\x00\x00\x00\x0b\x00\x00\x00')
 		self._write_cObjectGraphNode(f)
-		f.write(pack('<l', len(self.child_nodes)))
-		for t in self.child_nodes:
-			f.write(pack('<BBl', *t))
+		f.write(pack('<l', len(self.child_nodes)) + pack_records('<BBl', self.child_nodes))
 
 	def _write_cObjectGraphNode(self, f):
 		f.write(b'\x10cObjectGraphNode\x00\x00\x00\x00\x04\x00\x00\x00')
-		f.write(pack('<l', len(self.extensions)))
-		for t in self.extensions:
-			f.write(pack('<BBl', *t))
+		f.write(pack('<l', len(self.extensions)) + pack_records('<BBl', self.extensions))
 		write_str(f, self.obj_string)
 
 	def _write_cRenderableNode(self, f):
@@ -0,0 +1,263 @@
+#-------------------------------------------------------------------------------
+# Copyright (C) 2016  DjAlex88 (https://github.com/djalex88/)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#-------------------------------------------------------------------------------
+
+
+
+
+__all__ = ['PackageEntry', 'Package', 'load_package', 'RESOURCE_TYPES', 'TYPE_GMDC', 'TYPE_CRES']
+
+import mmap
+from collections import namedtuple
+from struct import unpack
+
+from ._common import *
+from ._codec import *
+from ._resfile import ResourceFile
+from ._qfs import is_qfs, qfs_decompress
+
+########################################
+##  DBPF package (*.package)
+########################################
+
+TYPE_GMDC = 0xAC4F8687
+TYPE_CRES = 0xE519C933
+TYPE_DIR  = 0xE86B1EEF
+
+# { type_id -> short name }
+RESOURCE_TYPES = {
+	TYPE_GMDC  : 'GMDC',
+	TYPE_CRES  : 'CRES',
+	0x7BA3838C : 'GMND',
+	0xFC6EB1F7 : 'SHPE',
+	0x49596978 : 'TXMT',
+	0x1C4A276C : 'TXTR',
+	0xED534136 : 'LIFO',
+	0xFB00791E : 'ANIM',
+	TYPE_DIR   : 'DIR',
+	}
+
+# index entry
+# - type, group, instance, instance_hi: resource identifier (TGI);
+#   instance_hi is 0 for packages with short (20 bytes) entries
+# - offset, size: location of resource data in package file
+# - uncompressed_size: size of resource after decompression (from directory
+#   of compressed files) or None if resource is not compressed
+PackageEntry = namedtuple('PackageEntry', 'type group instance instance_hi offset size uncompressed_size')
+
+class Package(object):
+
+	def __init__(self, filename=None, log_level=1):
+		self._clear()
+		if filename != None: self.load(filename, log_level)
+
+	def _clear(self):
+		self.filename = None
+		self.version = None       # (major, minor)
+		self.index_version = None # (major, minor)
+		self.entries = list()
+		self._buf = None
+		self._file = None
+
+	def __str__(self):
+		s = 'Package\n'
+		if self.filename: s+= '--Filename: "%s"\n' % self.filename
+		if self.version: s+= '--Version: %i.%i (index: %i.%i)\n' % (self.version + self.index_version)
+		s+= '--Number of resources: %i' % len(self.entries)
+		return s
+
+	def __repr__(self):
+		return self.__str__()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+	#---------------------------------------
+
+	def load(self, filename, log_level=1, use_mmap=True):
+
+		# reads header and index only; resource data is read on demand
+		# (see read), from memory-mapped file if possible
+
+		self.close()
+
+		f = open(filename, 'rb')
+		buf = None
+		if use_mmap:
+			try:
+				buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+			except (ValueError, OSError, mmap.error):
+				pass # empty file, unsupported file system, etc.
+
+		if buf is not None:
+			f.close()
+			self._buf = memoryview(buf)
+			ok = self._load(BufferReader(buf), len(buf), log_level)
+		else:
+			file_size = f.seek(0, 2)
+			f.seek(0)
+			ok = self._load(f, file_size, log_level)
+			self._file = f
+
+		if not ok:
+			self.close()
+			return False
+
+		self.filename = filename
+
+		return True
+
+	def load_buffer(self, buf, log_level=1):
+
+		# package in memory (bytes, bytearray, mmap, etc.);
+		# read() returns zero-copy slices of the buffer
+
+		self.close()
+
+		f = BufferReader(buf)
+		if not self._load(f, len(f.buf), log_level):
+			self._clear()
+			return False
+
+		self._buf = f.buf
+
+		return True
+
+	def close(self):
+		buf = self._buf
+		if self._file:
+			self._file.close()
+		self._clear()
+		if isinstance(buf, memoryview) and isinstance(buf.obj, mmap.mmap):
+			m = buf.obj
+			buf.release()
+			try:
+				m.close()
+			except BufferError:
+				pass # resource data still in use; the mapping is closed when it is released
+
+	def _load(self, f, file_size, log_level):
+
+		s = f.read(96)
+		if len(s) < 96 or s[:4] != b'DBPF':
+			error( 'Error! Not a DBPF package:', to_hex(s[:4]) )
+			return False
+
+		v = unpack('<4s15L32x', s)
+		self.version = v[1:3]
+		index_major, index_count, index_offset, index_size = v[8:12]
+		index_minor = v[15]
+		self.index_version = (index_major, index_minor)
+
+		# index entries are 24 bytes long (with instance_hi)
+		# in packages 1.1+ with index version 7.2, 20 bytes otherwise
+		entry_size = 24 if self.version >= (1, 1) and index_minor == 2 else 20
+
+		if log_level > 0:
+			log( 'DBPF version: %i.%i' % self.version )
+			log( 'Index version: %i.%i, entries: %i, offset: %08x, size: %i' % (index_major, index_minor, index_count, index_offset, index_size) )
+
+		if index_count and index_size and index_size != index_count * entry_size:
+			error( 'Error! Unexpected index size (%i entries, %i bytes).' % (index_count, index_size) )
+			return False
+		if index_offset + index_count * entry_size > file_size:
+			error( 'Error! Index is out of bounds.' )
+			return False
+
+		f.seek(index_offset)
+		v = read_records(f, '<6L' if entry_size == 24 else '<5L', index_count)
+		if entry_size == 20:
+			v = [(t, g, i, 0, offset, size) for t, g, i, offset, size in v]
+
+		for t in v:
+			if t[4] + t[5] > file_size:
+				error( 'Error! Resource %08X-%08X-%08X-%08X is out of bounds.' % t[:4] )
+				return False
+
+		# directory of compressed files (type, group, instance[, instance_hi], uncompressed_size)
+		#
+		compressed = {}
+		for t in v:
+			if t[0] == TYPE_DIR:
+				f.seek(t[4])
+				for r in read_records(f, '<5L' if entry_size == 24 else '<4L', t[5] // (entry_size - 4)):
+					compressed[r[:4] if entry_size == 24 else r[:3] + (0,)] = r[-1]
+
+		self.entries = [PackageEntry(*(t + (compressed.get(t[:4]),))) for t in v]
+
+		if log_level > 0:
+			log( 'Resources: %i (compressed: %i)' % (len(self.entries), len(compressed)) )
+			if log_level > 1:
+				for e in self.entries:
+					log( '%08X - %08X - %08X - %08X (%s) offset: %08x, size: %i' % (e.type, e.group, e.instance, e.instance_hi, RESOURCE_TYPES.get(e.type, '?'), e.offset, e.size) )
+
+		return True
+
+	#---------------------------------------
+
+	def find(self, type=None, group=None, instance=None, instance_hi=None):
+
+		# entries matching given TGI parts (None - any)
+
+		return [e for e in self.entries if
+			(type        is None or e.type        == type) and
+			(group       is None or e.group       == group) and
+			(instance    is None or e.instance    == instance) and
+			(instance_hi is None or e.instance_hi == instance_hi)]
+
+	def read(self, entry, raw=False):
+
+		# resource data; compressed resources are decompressed into
+		# a new bytearray of uncompressed size (see qfs_decompress);
+		# raw data is a zero-copy memoryview for memory-mapped
+		# or in-memory packages, bytes otherwise
+
+		if self._buf is not None:
+			data = self._buf[entry.offset : entry.offset + entry.size]
+		else:
+			self._file.seek(entry.offset)
+			data = self._file.read(entry.size)
+
+		if raw or entry.uncompressed_size is None or not is_qfs(data, 4):
+			return data
+
+		return qfs_decompress(data, bytearray(entry.uncompressed_size), 4)
+
+	def load_resource(self, entry, log_level=1, **options):
+
+		# parses resource (GMDC, CRES, etc.) straight from package data;
+		# options - see ResourceFile.load_buffer
+
+		try:
+			data = self.read(entry)
+		except ValueError as e:
+			error( 'Error! Could not decompress resource %08X-%08X-%08X-%08X (%s).' % (entry[:4] + (e,)) )
+			return False
+
+		return ResourceFile.from_bytes(data, log_level, **options)
+
+def load_package(filename, log_level=1, use_mmap=True):
+
+	package = Package()
+	return package if package.load(filename, log_level, use_mmap) else False
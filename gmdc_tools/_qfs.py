@@ -0,0 +1,145 @@
+#-------------------------------------------------------------------------------
+# Copyright (C) 2016  DjAlex88 (https://github.com/djalex88/)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#-------------------------------------------------------------------------------
+
+
+
+
+__all__ = ['is_qfs', 'qfs_uncompressed_size', 'qfs_decompress']
+
+########################################
+##  QFS (RefPack) decompression
+########################################
+
+# RefPack header: flags (0x10, +0x01 - compressed size present,
+# +0x80 - 4-byte sizes), 0xFB, compressed size (optional), uncompressed size
+# (both big-endian); compressed resources of DBPF packages are prefixed
+# with compressed size (4 bytes), i.e., their header is at offset 4
+
+def _header(data, offset):
+	# (position of first control code, uncompressed size) or None
+	if len(data) < offset + 2 or data[offset] & 0x7E != 0x10 or data[offset+1] != 0xFB:
+		return None
+	flags = data[offset]
+	n = 4 if flags & 0x80 else 3
+	pos = offset + 2 + (n if flags & 0x01 else 0)
+	if len(data) < pos + n:
+		return None
+	size = int.from_bytes(bytes(data[pos : pos+n]), 'big')
+	return pos + n, size
+
+def is_qfs(data, offset=0):
+	return _header(data, offset) is not None
+
+def qfs_uncompressed_size(data, offset=0):
+	h = _header(data, offset)
+	return h[1] if h else None
+
+def qfs_decompress(data, out=None, offset=0):
+
+	# data - compressed resource (bytes, memoryview, etc.)
+	# out - preallocated writable buffer of (at least) uncompressed size,
+	#   bytearray(uncompressed_size) is created if None
+	# offset - position of RefPack header (4 for package resources)
+	# returns out; raises ValueError if data is not valid QFS
+
+	h = _header(data, offset)
+	if h is None:
+		raise ValueError('Not QFS data')
+	pos, size = h
+
+	if out is None:
+		out = bytearray(size)
+	dst = memoryview(out)
+	if dst.format != 'B' or dst.ndim != 1:
+		dst = dst.cast('B')
+	if len(dst) < size:
+		raise ValueError('Output buffer is too small (%i < %i)' % (len(dst), size))
+
+	# control codes are read from bytes (faster indexing than memoryview);
+	# slice assignments into the memoryview never resize the output
+	# and fail on truncated data
+	src = data if isinstance(data, bytes) else bytes(data)
+	end = len(src)
+	d = 0
+
+	try:
+		while pos < end:
+			b0 = src[pos]
+			if b0 < 0x80:
+				b1 = src[pos+1]
+				pos+= 2
+				plain = b0 & 0x03
+				copy = ((b0 & 0x1C) >> 2) + 3
+				offset = ((b0 & 0x60) << 3) + b1 + 1
+			elif b0 < 0xC0:
+				b1 = src[pos+1]
+				b2 = src[pos+2]
+				pos+= 3
+				plain = b1 >> 6
+				copy = (b0 & 0x3F) + 4
+				offset = ((b1 & 0x3F) << 8) + b2 + 1
+			elif b0 < 0xE0:
+				b1 = src[pos+1]
+				b2 = src[pos+2]
+				b3 = src[pos+3]
+				pos+= 4
+				plain = b0 & 0x03
+				copy = ((b0 & 0x0C) << 6) + b3 + 5
+				offset = ((b0 & 0x10) << 12) + (b1 << 8) + b2 + 1
+			else:
+				# literals only; 0xFC..0xFF - end of data
+				plain = ((b0 & 0x1F) << 2) + 4 if b0 < 0xFC else b0 & 0x03
+				pos+= 1
+				dst[d:d+plain] = src[pos:pos+plain]
+				d+= plain
+				pos+= plain
+				if b0 >= 0xFC:
+					break
+				continue
+
+			if plain:
+				dst[d:d+plain] = src[pos:pos+plain]
+				d+= plain
+				pos+= plain
+
+			# back-reference
+			s = d - offset
+			if s < 0:
+				raise ValueError('Invalid back-reference at %i' % pos)
+			if offset >= copy:
+				# no overlap: one block copy
+				dst[d:d+copy] = dst[s:s+copy]
+			elif offset == 1:
+				# run of one byte
+				dst[d:d+copy] = bytes(dst[s:d]) * copy
+			else:
+				# overlapping: repeated pattern of offset bytes
+				dst[d:d+copy] = (bytes(dst[s:d]) * (copy // offset + 1))[:copy]
+			d+= copy
+
+	except IndexError:
+		raise ValueError('Unexpected end of data')
+
+	if d != size:
+		raise ValueError('Wrong uncompressed size (%i, expected %i)' % (d, size))
+
+	return out
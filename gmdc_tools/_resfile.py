@@ -21,13 +21,16 @@
 #-------------------------------------------------------------------------------
 
 
-__all__ = ['load_resource']
+__all__ = ['load_resource', 'load_resource_from_buffer', 'scan_gmdc', 'iter_gmdc', 'patch_gmdc']
 
-from struct import pack, unpack
+import mmap
+import os
+from struct import pack, unpack, error as StructError
 
 from ._common import *
+from ._codec import *
 from ._node import _SGNode
-from ._gmdc import GeometryDataContainer
+from ._gmdc import GeometryDataContainer, iter_geometry_records, encode_section, SectionRecord, TailRecord
 
 ########################################
 ##  Node classes
@@ -40,12 +43,8 @@ class ResourceNode(_SGNode):
 		self.type = 'cResourceNode'
 		self.version = 0x07
 
-	def read(self, f, log_level):
-		s = f.read(18)
-		if s != b'\x0dcResourceNode\x33\xc9\x19\xe5':
-			error( 'Error! cResourceNode header:', to_hex(s) )
-			error( '%#x' % f.tell() )
-			return False
+	def read(self, f, log_level, **options):
+		if not self._read_check_header(f, b'\x0dcResourceNode\x33\xc9\x19\xe5'): return False
 		if not self._read_check_version(f, 0x07): return False
 		self.Res_unknown1 = f.read(1)
 		if not self._read_cSGResource(f) or not self._read_cCompositionTreeNode(f): return False
@@ -74,22 +73,15 @@ class ShapeRefNode(_SGNode):
 		self.type = 'cShapeRefNode'
 		self.version = 0x14
 
-	def read(self, f, log_level):
-		s = f.read(18)
-		if s != b'\x0dcShapeRefNode\x17\x55\x24\x65':
-			error( 'Error! cShapeRefNode header:', to_hex(s) )
-			error( '%#x' % f.tell() )
-			return False
+	def read(self, f, log_level, **options):
+		if not self._read_check_header(f, b'\x0dcShapeRefNode\x17\x55\x24\x65'): return False
 		if not self._read_check_version(f, (0x14, 0x15)) or not self._read_cRenderableNode(f): return False
 		# linked resource indices (?)
-		i = unpack('<l', f.read(4))[0]
-		s = f.read(i*6)
-		v = unpack('<'+'BBl'*(len(s)//6), s)
-		self.SR_data1 = chunk(v, 3)
+		self.SR_data1 = read_records(f, '<BBl', read_int(f))
 		# 4 bytes
 		self.SR_unknown1 = f.read(4)
 		# morphs (?)
-		i = unpack('<l', f.read(4))[0]
+		i = read_int(f)
 		s = f.read(4*i)
 		self.SR_data2 = chunk(s, 4)
 		if self.version >= 0x15:
@@ -99,8 +91,7 @@ class ShapeRefNode(_SGNode):
 				i-= 1
 			self.SR_strings = v
 		# unknown
-		i = unpack('<l', f.read(4))[0]
-		self.SR_unknown2 = f.read(i)
+		self.SR_unknown2 = f.read(read_int(f))
 		self.SR_unknown3 = f.read(4)
 		return True
 
@@ -108,9 +99,7 @@ class ShapeRefNode(_SGNode):
 		f.write(b'\x0dcShapeRefNode\x17\x55\x24\x65')
 		self._write_version(f)
 		self._write_cRenderableNode(f)
-		f.write(pack('<l', len(self.SR_data1)))
-		for t in self.SR_data1:
-			f.write(pack('<BBl', *t))
+		f.write(pack('<l', len(self.SR_data1)) + pack_records('<BBl', self.SR_data1))
 		f.write(self.SR_unknown1)
 		f.write(pack('<l', len(self.SR_data2)))
 		for s in self.SR_data2:
@@ -143,7 +132,7 @@ class TransformNode(_SGNode):
 		self.type = 'cTransformNode'
 		self.version = 0x07
 
-	def read(self, f, log_level):
+	def read(self, f, log_level, **options):
 		return self._read_cTransformNode(f)
 
 	def write(self, f):
@@ -159,12 +148,8 @@ class DataListExtension(_SGNode):
 		self.type = 'cDataListExtension'
 		self.version = 0x01
 
-	def read(self, f, log_level):
-		s = f.read(23)
-		if s != b'\x12cDataListExtension\x56\x6d\x83\x6a':
-			error( 'Error! cDataListExtension header:', to_hex(s) )
-			error( '%#x' % f.tell() )
-			return False
+	def read(self, f, log_level, **options):
+		if not self._read_check_header(f, b'\x12cDataListExtension\x56\x6d\x83\x6a'): return False
 		v = []
 		if not self._read_check_version(f, 0x01) or not self._read_cExtension_h(f) or not self._read_ext_data(f, v): return False
 		assert len(v) == 1
@@ -173,24 +158,23 @@ class DataListExtension(_SGNode):
 
 	@staticmethod
 	def _read_ext_data(f, data):
-		i = unpack('B', f.read(1))[0] # type
+		i = read_struct(f, 'B')[0] # type
 		s = read_str(f) # name
 		if   i == 0x06: # string (?)
 			data.append( (0x06, s, read_str(f)) )
 		elif i == 0x02: # int (?)
-			data.append( (0x02, s, unpack('<l', f.read(4))[0]) )
+			data.append( (0x02, s, read_int(f)) )
 		elif i == 0x03: # float (?)
-			data.append( (0x03, s, unpack('<f', f.read(4))[0]) )
+			data.append( (0x03, s, read_struct(f, '<f')[0]) )
 		elif i == 0x05: # 3 floats (?)
-			data.append( (0x05, s, unpack('<3f', f.read(12))) )
+			data.append( (0x05, s, read_struct(f, '<3f')) )
 		elif i == 0x08: # 4 floats (?)
-			data.append( (0x08, s, unpack('<4f', f.read(16))) )
+			data.append( (0x08, s, read_struct(f, '<4f')) )
 		elif i == 0x09: # N bytes (?)
-			i = unpack('<l', f.read(4))[0]
-			data.append( (0x09, s, f.read(i)) )
+			data.append( (0x09, s, f.read(read_int(f))) )
 		elif i == 0x07: # list of data
 			v = []
-			for i in xrange(unpack('<l', f.read(4))[0]):
+			for i in xrange(read_int(f)):
 				if not DataListExtension._read_ext_data(f, v): return False
 			data.append( (0x07, s, v) )
 		else:
@@ -265,16 +249,13 @@ class BoneDataExtension(_SGNode):
 		self.type = 'cBoneDataExtension'
 		self.version = 0x04
 
-	def read(self, f, log_level):
-		s = f.read(23)
-		if s != b'\x12cBoneDataExtension\xc5\x5b\x07\xe9':
-			error( 'Error! cBoneDataExtension header:', to_hex(s) )
-			error( '%#x' % f.tell() )
-			return False
+	def read(self, f, log_level, **options):
+		if not self._read_check_header(f, b'\x12cBoneDataExtension\xc5\x5b\x07\xe9'): return False
 		if not self._read_check_version(f, (0x04, 0x05)) or not self._read_cExtension_h(f): return False
 		self.B_ext_unknown = f.read(12)
-		self.B_ext_float = unpack('<f', f.read(4))[0]
-		self.B_ext_quat = unpack('<4f', f.read(16))
+		v = read_struct(f, '<5f')
+		self.B_ext_float = v[0]
+		self.B_ext_quat = v[1:]
 		return True
 
 	def write(self, f):
@@ -299,14 +280,10 @@ class LightRefNode(_SGNode):
 		self.type = 'cLightRefNode'
 		self.version = 0x0a
 
-	def read(self, f, log_level):
-		s = f.read(18)
-		if s != b'\x0dcLightRefNode\x18\x20\x3d\x25':
-			error( 'Error! cLightRefNode header:', to_hex(s) )
-			error( '%#x' % f.tell() )
-			return False
+	def read(self, f, log_level, **options):
+		if not self._read_check_header(f, b'\x0dcLightRefNode\x18\x20\x3d\x25'): return False
 		if not self._read_check_version(f, 0x0a) or not self._read_cRenderableNode(f): return False
-		self.L_index = unpack('<BBl', f.read(6))
+		self.L_index = read_struct(f, '<BBl')
 		self.L_unknown = f.read(2)
 		return True
 
@@ -332,11 +309,7 @@ class ViewerRefNode(_SGNode):
 		self.version = 0x0d
 
 	def _read_cViewerRefNodeBase(self, f):
-		s = f.read(27)
-		if s != b'\x12cViewerRefNodeBase\x00\x00\x00\x00\x05\x00\x00\x00':
-			error( 'Error! cViewerRefNodeBase header:', to_hex(s) )
-			error( '%#x' % f.tell() )
-			return False
+		if not self._read_check_header(f, b'\x12cViewerRefNodeBase\x00\x00\x00\x00\x05\x00\x00\x00'): return False
 		return self._read_cRenderableNode(f)
 
 	def _write_cViewerRefNodeBase(self, f):
@@ -346,12 +319,8 @@ class ViewerRefNode(_SGNode):
 	def _str_cViewerRefNodeBase(self):
 		return self._str_cRenderableNode()
 
-	def read(self, f, log_level):
-		s = f.read(19)
-		if s != b'\x0ecViewerRefNode\xbb\x6d\xa7\xdc':
-			error( 'Error! cViewerRefNode header:', to_hex(s) )
-			error( '%#x' % f.tell() )
-			return False
+	def read(self, f, log_level, **options):
+		if not self._read_check_header(f, b'\x0ecViewerRefNode\xbb\x6d\xa7\xdc'): return False
 		if not self._read_check_version(f, (0x0d, 0x0e)) or not self._read_cViewerRefNodeBase(f): return False
 		self.V_data = f.read(0x9c if self.version==0x0E else 0x9b)
 		return True
@@ -376,12 +345,8 @@ class ViewerRefNodeRecursive(ViewerRefNode):
 		self.type = 'cViewerRefNodeRecursive'
 		self.version = 0x01
 
-	def read(self, f, log_level):
-		s = f.read(28)
-		if s != b'\x17cViewerRefNodeRecursive\x8e\x2b\x15\x0c':
-			error( 'Error! cViewerRefNodeRecursive header:', to_hex(s) )
-			error( '%#x' % f.tell() )
-			return False
+	def read(self, f, log_level, **options):
+		if not self._read_check_header(f, b'\x17cViewerRefNodeRecursive\x8e\x2b\x15\x0c'): return False
 		if not self._read_check_version(f, 0x01) or not self._read_cViewerRefNodeBase(f): return False
 		self.VR_unknown = f.read(1)
 		self.VR_string = read_str(f)
@@ -412,12 +377,8 @@ class GeometryNode(_SGNode):
 		self.type = 'cGeometryNode'
 		self.version = 0x0c
 
-	def read(self, f, log_level):
-		s = f.read(18)
-		if s != b'\x0dcGeometryNode\x8c\x83\xa3\x7b':
-			error( 'Error! cGeometryNode header:', to_hex(s) )
-			error( '%#x' % f.tell() )
-			return False
+	def read(self, f, log_level, **options):
+		if not self._read_check_header(f, b'\x0dcGeometryNode\x8c\x83\xa3\x7b'): return False
 		if not self._read_check_version(f, 0x0c) or not self._read_cObjectGraphNode(f) or not self._read_cSGResource(f): return False
 		self.G_unknown = f.read(7)
 		return True
@@ -442,22 +403,18 @@ class MaterialDefinition(_SGNode):
 		self.type = 'cMaterialDefinition'
 		self.version = 0x0b
 
-	def read(self, f, log_level):
-		s = f.read(24)
-		if s != b'\x13cMaterialDefinition\x78\x69\x59\x49':
-			error( 'Error! cGeometryNode header:', to_hex(s) )
-			error( '%#x' % f.tell() )
-			return False
+	def read(self, f, log_level, **options):
+		if not self._read_check_header(f, b'\x13cMaterialDefinition\x78\x69\x59\x49'): return False
 		if not self._read_check_version(f, 0x0b) or not self._read_cSGResource(f): return False
 		self.Mat_name = read_str(f)
 		self.Mat_type = read_str(f)
-		i = unpack('<l', f.read(4))[0]
+		i = read_int(f)
 		v = []
 		while i:
 			v.append( (read_str(f), read_str(f)) )
 			i-= 1
 		self.Mat_properties = v
-		i = unpack('<l', f.read(4))[0]
+		i = read_int(f)
 		v = []
 		while i:
 			v.append(read_str(f))
@@ -520,20 +477,56 @@ class ResourceFile(object):
 
 	#---------------------------------------
 
-	def load(self, filename, log_level=1):
+	def load(self, filename, log_level=1, use_numpy=False, use_mmap=False, lazy=False, headers_only=False, threads=None, lazy_nodes=False, index_cache=False):
+
+		# lazy_nodes - locate nodes only, parse them on first access of self.nodes[i]
+		#   (implies use_mmap)
+		# index_cache - save node offsets into sidecar file (see lazy_nodes)
 
 		with open(filename, 'rb') as f:
-			s = f.read(4)
-			if s != b'\x01\x00\xff\xff':
-				error( 'Error! Wrong file header:', to_hex(s) )
-				return False
+			if use_mmap or lazy_nodes:
+				# parse from memory-mapped file;
+				# section payloads are zero-copy slices of the mapping
+				f = BufferReader(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+			node_offsets = None
+			if lazy_nodes and index_cache:
+				node_offsets = _read_node_index(filename)
 
-			if not self._load_resource(f, log_level):
-				self._clear()
+			if not self._load(f, log_level, lazy_nodes, node_offsets, use_numpy=use_numpy, lazy=lazy, headers_only=headers_only, threads=threads):
 				return False
 
+			if lazy_nodes and index_cache and node_offsets != self.nodes.offsets:
+				_write_node_index(filename, self.nodes.offsets)
+
 		self.filename = filename
 
+		return True
+
+	def load_buffer(self, buf, log_level=1, use_numpy=False, lazy=False, headers_only=False, threads=None, lazy_nodes=False):
+
+		# parse from bytes, bytearray, memoryview, etc.;
+		# section payloads are zero-copy slices of the buffer,
+		# i.e., the buffer must not be modified while they are in use
+
+		return self._load(BufferReader(buf), log_level, lazy_nodes, use_numpy=use_numpy, lazy=lazy, headers_only=headers_only, threads=threads)
+
+	@classmethod
+	def from_bytes(cls, buf, log_level=1, **options):
+		res = cls()
+		return res if res.load_buffer(buf, log_level, **options) else False
+
+	def _load(self, f, log_level, lazy_nodes=False, node_offsets=None, **options):
+
+		s = f.read(4)
+		if s != b'\x01\x00\xff\xff':
+			error( 'Error! Wrong file header:', to_hex(s) )
+			return False
+
+		if not self._load_resource(f, log_level, lazy_nodes, node_offsets, **options):
+			self._clear()
+			return False
+
 		try:
 			self.sg_resource_name = self.nodes[0].sg_resource_name
 		except:
@@ -541,13 +534,12 @@ class ResourceFile(object):
 
 		return True
 
-	def _load_resource(self, f, log_level):
+	def _load_resource(self, f, log_level, lazy_nodes=False, node_offsets=None, **options):
 
 		# linked resources
 		#
-		k = unpack('<l', f.read(4))[0]
-		s = chunk(f.read(k*16), 16)
-		self.linked_resources = map(lambda x: unpack('<4L', x), s)
+		k = read_int(f)
+		self.linked_resources = read_records(f, '<4L', k)
 		assert len(self.linked_resources) == k
 
 		if log_level > 0:
@@ -557,26 +549,26 @@ class ResourceFile(object):
 
 		# types of nodes
 		#
-		k = unpack('<l', f.read(4))[0]
+		k = read_int(f)
 		s = f.read(k*4)
 		node_types = chunk(s, 4)
 		assert len(node_types) == k
 
 		if log_level > 0: log( 'Number of nodes:', k )
 
-		dd = {
-			b'\x33\xc9\x19\xe5' : ResourceNode,
-			b'\x62\x64\x24\x65' : TransformNode,
-			b'\x17\x55\x24\x65' : ShapeRefNode,
-			b'\x56\x6d\x83\x6a' : DataListExtension,
-			b'\xc5\x5b\x07\xe9' : BoneDataExtension,
-			b'\x18\x20\x3d\x25' : LightRefNode,
-			b'\xbb\x6d\xa7\xdc' : ViewerRefNode,
-			b'\x8e\x2b\x15\x0c' : ViewerRefNodeRecursive,
-			b'\x8c\x83\xa3\x7b' : GeometryNode,
-			b'\x87\x86\x4F\xAC' : GeometryDataContainer,
-			b'\x78\x69\x59\x49' : MaterialDefinition,
-			}
+		dd = _NODE_CLASSES
+
+		if lazy_nodes:
+			# node offsets (cached or found by node headers)
+			if node_offsets is None or not _check_node_offsets(f.buf, node_types, node_offsets, f.tell()):
+				node_offsets = _find_nodes(f.buf, f.tell(), node_types)
+				if node_offsets is None or not _check_node_offsets(f.buf, node_types, node_offsets, f.tell()):
+					return False
+			self.nodes = LazyNodeList(f.buf, node_types, node_offsets, log_level, options)
+			if log_level > 0:
+				for i, offset in enumerate(node_offsets):
+					log( '>Node #%s (offset: %08x) - ' % (str(i).rjust(4, '_'), offset) + self.nodes.types[i] )
+			return True
 
 		# nodes
 		#
@@ -593,7 +585,7 @@ class ResourceFile(object):
 				return False
 
 			node = _class(i)
-			if not node.read(f, log_level): return False
+			if not node.read(f, log_level, **options): return False
 
 			Nodes.append(node)
 
@@ -645,11 +637,255 @@ class ResourceFile(object):
 
 #<- /ResourceFile
 
+_NODE_CLASSES = {
+	b'\x33\xc9\x19\xe5' : ResourceNode,
+	b'\x62\x64\x24\x65' : TransformNode,
+	b'\x17\x55\x24\x65' : ShapeRefNode,
+	b'\x56\x6d\x83\x6a' : DataListExtension,
+	b'\xc5\x5b\x07\xe9' : BoneDataExtension,
+	b'\x18\x20\x3d\x25' : LightRefNode,
+	b'\xbb\x6d\xa7\xdc' : ViewerRefNode,
+	b'\x8e\x2b\x15\x0c' : ViewerRefNodeRecursive,
+	b'\x8c\x83\xa3\x7b' : GeometryNode,
+	b'\x87\x86\x4F\xAC' : GeometryDataContainer,
+	b'\x78\x69\x59\x49' : MaterialDefinition,
+	}
+
+class LazyNodeList(object):
+	# sequence of nodes (see lazy_nodes); a node is parsed on first access,
+	# offsets and types are known without parsing
+
+	def __init__(self, buf, node_types, offsets, log_level, options):
+		self._buf = buf
+		self._classes = [_NODE_CLASSES[t] for t in node_types]
+		self._nodes = [None] * len(offsets)
+		self._log_level = log_level
+		self._options = options
+		self.offsets = offsets
+		self.types = [_NODE_NAMES[t] for t in node_types]
+
+	def __len__(self):
+		return len(self._nodes)
+
+	def __iter__(self):
+		for i in range(len(self._nodes)):
+			yield self[i]
+
+	def __getitem__(self, i):
+		if isinstance(i, slice):
+			return [self[j] for j in range(*i.indices(len(self._nodes)))]
+		node = self._nodes[i]
+		if node is None:
+			i = range(len(self._nodes))[i]
+			node = self._classes[i](i)
+			if not node.read(BufferReader(self._buf, self.offsets[i]), self._log_level, **self._options):
+				raise IOError('Could not read node #%i (offset: %08x)' % (i, self.offsets[i]))
+			self._nodes[i] = node
+		return node
+
+# { type_id -> node class name }
+_NODE_NAMES = dict((k, c(0).type) for k, c in _NODE_CLASSES.items())
+
+# { type_id -> header } (name of node class followed by type id)
+_NODE_HEADERS = dict((k, pack('B', len(s)) + s.encode('latin_1') + k) for k, s in _NODE_NAMES.items())
+
+def _node_end(buf, nt_id, i, offset):
+	# node sizes are not stored, i.e., a node ends where its parser stops;
+	# geometry is scanned without reading payloads (see headers_only)
+	f = BufferReader(buf, offset)
+	try:
+		if not _NODE_CLASSES[nt_id](i).read(f, 0, headers_only=True):
+			return None
+	except (StructError, ValueError, AssertionError, IndexError, KeyError):
+		return None
+	return f.tell() if f.tell() <= len(buf) else None
+
+def _find_nodes(buf, offset, node_types):
+
+	# nodes are stored one after another; each node is parsed
+	# (see _node_end) to find where the next one starts
+
+	offsets = []
+	for i, nt_id in enumerate(node_types):
+		try:
+			header = _NODE_HEADERS[nt_id]
+		except KeyError:
+			error( 'Error! Unknown node.' )
+			error( '%#x' % offset )
+			return None
+		if buf[offset:offset+len(header)] != header:
+			error( 'Error! Could not locate node #%i.' % i )
+			return None
+		offsets.append(offset)
+		end = _node_end(buf, nt_id, i, offset)
+		if end is None:
+			error( 'Error! Could not read node #%i (offset: %08x).' % (i, offset) )
+			return None
+		offset = end
+	return offsets
+
+def _check_node_offsets(buf, node_types, offsets, offset):
+
+	# validates node offsets (cached or to be cached): the first node
+	# starts at offset, the others follow in order, each with its header;
+	# nodes are not parsed
+
+	if len(offsets) != len(node_types):
+		return False
+	lower = offset
+	for i, (nt_id, offset) in enumerate(zip(node_types, offsets)):
+		header = _NODE_HEADERS.get(nt_id, b'')
+		if not header or buf[offset:offset+len(header)] != header:
+			return False
+		if offset < lower or (i == 0 and offset != lower):
+			return False
+		lower = offset + len(header)
+	return True
+
+def _node_index_filename(filename):
+	return filename + '.nodeidx'
+
+def _read_node_index(filename):
 
-def load_resource(filename, log_level=1):
+	# sidecar file: size and mtime of resource file, node offsets
+
+	try:
+		with open(_node_index_filename(filename), 'rb') as f:
+			s = f.read()
+		st = os.stat(filename)
+	except (IOError, OSError):
+		return None
+	if len(s) < 24 or s[:4] != b'NIDX':
+		return None
+	size, mtime, k = unpack('<QqL', s[4:24])
+	if size != st.st_size or mtime != st.st_mtime_ns or len(s) != 24 + 8*k:
+		return None
+	return list(unpack_array('Q', s[24:]))
+
+def _write_node_index(filename, offsets):
+	try:
+		st = os.stat(filename)
+		with open(_node_index_filename(filename), 'wb') as f:
+			f.write(b'NIDX' + pack('<QqL', st.st_size, st.st_mtime_ns, len(offsets)) + pack_array('Q', offsets))
+	except (IOError, OSError) as e:
+		error( 'Error! Could not write node index:', e )
+
+
+def load_resource(filename, log_level=1, use_numpy=False, use_mmap=False, lazy=False, headers_only=False, threads=None, lazy_nodes=False, index_cache=False):
 
 	res = ResourceFile()
-	return res if res.load(filename, log_level) else False
+	return res if res.load(filename, log_level, use_numpy, use_mmap, lazy, headers_only, threads, lazy_nodes, index_cache) else False
+
+def load_resource_from_buffer(buf, log_level=1, use_numpy=False, lazy=False, headers_only=False, threads=None, lazy_nodes=False):
+
+	return ResourceFile.from_bytes(buf, log_level, use_numpy=use_numpy, lazy=lazy, headers_only=headers_only, threads=threads, lazy_nodes=lazy_nodes)
+
+def scan_gmdc(filename, log_level=0):
+
+	# metadata only, returns GeometryInfo (see headers_only)
+
+	res = load_resource(filename, log_level, headers_only=True)
+	if not res:
+		return False
+	if not res.nodes or res.nodes[0].type != 'cGeometryDataContainer':
+		error( 'Error! Not a GMDC file!' )
+		return False
+	return res.nodes[0].geometry_info
+
+def iter_gmdc(filename, payloads=True):
+
+	# streams records of GMDC file (see iter_geometry_records)
+
+	with open(filename, 'rb') as f:
+		if not _seek_geometry_data(f):
+			return
+		for rec in iter_geometry_records(f, payloads):
+			yield rec
+
+def patch_gmdc(filename, sections=None, inverse_transforms=None):
+
+	# overwrites parts of GMDC file without parsing the rest
+	# sections - { section_index -> data } (see encode_section);
+	#   keeping element counts consistent with data groups is up to the caller
+	# inverse_transforms - [(rot, loc)]
+	# same-size parts are overwritten in place, otherwise the file
+	# is rewritten from the first resized part on
+
+	sections = dict(sections or {})
+
+	with open(filename, 'r+b') as f:
+		if not _seek_geometry_data(f):
+			return False
+
+		# locate sections and the tail (inverse transforms, etc.)
+		section_records = []
+		tail_offset = None
+		for rec in iter_geometry_records(f, payloads=False):
+			if type(rec) == TailRecord:
+				tail_offset = rec.offset
+				break
+			if type(rec) == SectionRecord:
+				section_records.append( (rec, f.tell()) )
+
+		# [(start, end, data)]
+		parts = []
+
+		for k in sorted(sections):
+			if not 0 <= k < len(section_records):
+				error( 'Error! Section index is out of range: %i' % k )
+				return False
+			rec, end = section_records[k]
+			if rec.type not in ('V', 'N', 'T', 'B', 'W', 'X', 'dV', 'dN', 'K', 'M', '4', '5'):
+				error( 'Error! Section type is not supported: %s' % rec.name )
+				return False
+			parts.append( (rec.offset, rec.offset+24+rec.size, encode_section(rec, sections[k])) )
+
+		if inverse_transforms is not None:
+			f.seek(tail_offset)
+			k = read_int(f)
+			s = pack('<l', len(inverse_transforms)) + pack_rows('f', [tuple(rot) + tuple(loc) for rot, loc in inverse_transforms])
+			parts.append( (tail_offset, tail_offset+4+k*28, s) )
+
+		resized = [i for i, (start, end, s) in enumerate(parts) if end-start != len(s)]
+		k = resized[0] if resized else len(parts)
+
+		# in place
+		for start, end, s in parts[:k]:
+			f.seek(start)
+			f.write(s)
+
+		# rewrite the rest of the file
+		if k < len(parts):
+			offset = parts[k][0]
+			f.seek(offset)
+			buf = f.read()
+			v = []
+			i = 0
+			for start, end, s in parts[k:]:
+				v.append(buf[i:start-offset])
+				v.append(s)
+				i = end-offset
+			v.append(buf[i:])
+			f.seek(offset)
+			f.write(b''.join(v))
+			f.truncate()
+
+	return True
+
+def _seek_geometry_data(f):
+
+	# skips to the geometry data of GMDC file (see iter_geometry_records)
+
+	s = f.read(4)
+	if s != b'\x01\x00\xff\xff':
+		error( 'Error! Wrong file header:', to_hex(s) )
+		return False
+	f.seek(read_int(f)*16, 1) # linked resources
+	k = read_int(f)
+	if f.read(k*4) != b'\x87\x86\x4F\xAC':
+		error( 'Error! Not a GMDC file!' )
+		return False
+	return GeometryDataContainer(0)._read_header(f)
 
 
 #-------------------------------------------------------------------------------
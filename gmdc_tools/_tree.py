@@ -21,7 +21,12 @@
 #-------------------------------------------------------------------------------
 
 
-__all__ = ['Vector', 'Matrix', 'Quaternion', 'Transform', 'build_transform_tree']
+__all__ = ['Vector', 'Matrix', 'Quaternion', 'Transform', 'build_transform_tree', 'read_transform_tree', 'write_transform_tree']
+
+from struct import pack
+
+from ._common import read_str, write_str
+from ._codec import read_int, unpack_array, pack_array
 
 ########################################
 ##  Classes
@@ -246,13 +251,7 @@ def build_transform_tree(sg_nodes):
 		'cTransformNode' : 'Transform', 'cShapeRefNode' : 'ShapeRef', 'cLightRefNode' : 'LightRef',
 		'cViewerRefNode' : 'ViewerRef', 'cViewerRefNodeRecursive' : 'ViewerRefRecursive' }
 
-	def add_to_dict(dict, key, x):
-		try:
-			dict[key]+= (x,)
-		except KeyError:
-			dict[key] = x
-		except:
-			dict[key] = (dict[key], x)
+	add_to_dict = _add_to_dict
 
 	def build_tree_nodes(indices):
 
@@ -288,3 +287,83 @@ def build_transform_tree(sg_nodes):
 	tree._calc_abs_trans(tree.root_nodes)
 
 	return tree
+
+def _add_to_dict(dict, key, x):
+	try:
+		dict[key]+= (x,)
+	except KeyError:
+		dict[key] = x
+	except:
+		dict[key] = (dict[key], x)
+
+
+#-------------------------------------------------------------------------------
+
+# binary form of built tree (see build_transform_tree), e.g. for caching;
+# nodes in pre-order, stored as columns:
+#   parent indices (-1 - root node), bone indices (-1 - none),
+#   local and absolute transforms (loc, rot; doubles),
+#   types and names (None - empty string with flag)
+
+_TREE_MAGIC = b'TTR\x01'
+
+def write_transform_tree(f, tree):
+
+	nodes = list(tree)
+	index = dict((id(node), i) for i, node in enumerate(nodes))
+
+	parents = [index[id(node.parent)] if node.parent else -1 for node in nodes]
+	bone_indices = [-1 if node.bone_index == None else node.bone_index for node in nodes]
+	transforms = []
+	for node in nodes:
+		for t in (node.transform, node.abs_transform):
+			transforms.extend(t.loc.to_tuple() + t.rot.to_tuple())
+
+	f.write(_TREE_MAGIC + pack('<l', len(nodes)))
+	f.write(pack_array('l', parents) + pack_array('l', bone_indices) + pack_array('d', transforms))
+	f.write(pack_array('B', [node.name == None for node in nodes]))
+	for node in nodes:
+		write_str(f, node.type)
+		write_str(f, node.name or '')
+
+def read_transform_tree(f):
+
+	if f.read(4) != _TREE_MAGIC:
+		return None
+	k = read_int(f)
+
+	parents = unpack_array('l', f.read(4*k))
+	bone_indices = unpack_array('l', f.read(4*k))
+	transforms = unpack_array('d', f.read(8*14*k))
+	no_name = f.read(k)
+
+	tree = _myTransformTree()
+	tree.root_nodes = []
+	nodes = []
+	for i in range(k):
+		t = transforms[14*i:14*i+14]
+		node = _myTransformTreeNode(t[0:3], t[3:7], child_nodes=[],
+			bone_index = None if bone_indices[i] == -1 else bone_indices[i])
+		node.abs_transform = Transform(t[7:10], t[10:14])
+		node.type = read_str(f)
+		node.name = read_str(f)
+		if no_name[i]:
+			node.name = None
+		if parents[i] == -1:
+			tree.root_nodes.append(node)
+		else:
+			node.parent = nodes[parents[i]]
+			node.parent.child_nodes.append(node)
+		nodes.append(node)
+
+	# same order as in build_transform_tree (post-order)
+	def add_nodes_to_dict(nodes):
+		for node in nodes:
+			add_nodes_to_dict(node.child_nodes)
+			node.bone_index != None and \
+			_add_to_dict(tree._dict, node.bone_index, node)
+			_add_to_dict(tree._dict, node.name, node)
+
+	add_nodes_to_dict(tree.root_nodes)
+
+	return tree
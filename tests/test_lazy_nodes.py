@@ -0,0 +1,84 @@
+#-------------------------------------------------------------------------------
+# Copyright (C) 2016  DjAlex88 (https://github.com/djalex88/)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#-------------------------------------------------------------------------------
+
+# Tests of lazy node loading (run from the add-on directory):
+#   python -m unittest discover tests
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gmdc_tools import load_resource
+from gmdc_tools._resfile import ResourceFile, ResourceNode, TransformNode, DataListExtension, _NODE_HEADERS
+
+
+def make_resource():
+	# cResourceNode, cDataListExtension with data that looks like
+	# the header of cTransformNode, and cTransformNode
+	def composition(node):
+		node.child_nodes = []
+		node.extensions = []
+		node.obj_string = ''
+	r = ResourceNode(0)
+	r.Res_unknown1 = b'\x01'
+	r.sg_resource_name = 'test'
+	r.Res_unknown2 = b'\x00' * 5
+	composition(r)
+	d = DataListExtension(1)
+	d.Ext_data = (0x09, 'data', _NODE_HEADERS[b'\x62\x64\x24\x65'] + b'\x00' * 8)
+	t = TransformNode(2)
+	composition(t)
+	t.T_loc = (1.0, 2.0, 3.0)
+	t.T_rot = (0.0, 0.0, 0.0, 1.0)
+	t.T_bone_index = 5
+	res = ResourceFile()
+	res.linked_resources = []
+	res.nodes = [r, d, t]
+	return res
+
+class LazyNodesTest(unittest.TestCase):
+
+	def setUp(self):
+		self.dir = tempfile.mkdtemp()
+		self.filename = os.path.join(self.dir, 'test.cres')
+		make_resource().save_as(self.filename)
+
+	def tearDown(self):
+		shutil.rmtree(self.dir)
+
+	def test_node_header_in_data(self):
+		offsets = None
+		for i in range(2): # node offsets found, then cached
+			res = load_resource(self.filename, 0, lazy_nodes=True, index_cache=True)
+			self.assertTrue(res)
+			self.assertEqual(res.nodes.types, ['cResourceNode', 'cDataListExtension', 'cTransformNode'])
+			self.assertEqual(res.nodes[2].T_bone_index, 5)
+			self.assertTrue(offsets is None or res.nodes.offsets == offsets)
+			offsets = res.nodes.offsets
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,87 @@
+#-------------------------------------------------------------------------------
+# Copyright (C) 2016  DjAlex88 (https://github.com/djalex88/)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#-------------------------------------------------------------------------------
+
+# Tests of gmdc_tools.patch_gmdc (run from the add-on directory):
+#   python -m unittest discover tests
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gmdc_tools import DataGroup, IndexGroup, GeometryData, create_gmdc_file, load_resource, patch_gmdc
+
+
+def make_geometry(index_groups=True):
+	g = DataGroup()
+	g.vertices = [(0.0, 0.0, 0.0), (1.0, 0.0, 0.0), (0.0, 1.0, 0.0)]
+	g.normals = [(0.0, 0.0, 1.0)] * 3
+	g.count = 3
+	I = []
+	if index_groups:
+		ig = IndexGroup('tri')
+		ig.data_group_index = 0
+		ig.indices = [(0, 1, 2)]
+		ig.bones = []
+		I.append(ig)
+	return GeometryData([g], I, [((0.0, 0.0, 0.0, 1.0), (1.0, 2.0, 3.0))])
+
+class PatchInverseTransformsTest(unittest.TestCase):
+
+	def setUp(self):
+		self.dir = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(self.dir)
+
+	def patch(self, geometry, inverse_transforms):
+		filename = os.path.join(self.dir, 'test.gmdc')
+		create_gmdc_file(filename, 'test', geometry)
+		self.assertTrue(patch_gmdc(filename, inverse_transforms=inverse_transforms))
+		res = load_resource(filename, 0)
+		self.assertTrue(res)
+		return res.nodes[0].geometry
+
+	def test_in_place(self):
+		T = [((0.0, 0.0, 0.0, 1.0), (4.0, 5.0, 6.0))]
+		geometry = self.patch(make_geometry(), T)
+		self.assertEqual(geometry.inverse_transforms, T)
+		self.assertEqual(geometry.index_groups[0].indices, [(0, 1, 2)])
+
+	def test_resized(self):
+		T = [((0.0, 0.0, 0.0, 1.0), (4.0, 5.0, 6.0))] * 2
+		geometry = self.patch(make_geometry(), T)
+		self.assertEqual(geometry.inverse_transforms, T)
+
+	def test_no_index_groups(self):
+		# the tail follows the (empty) block of index groups
+		for T in ([((0.0, 0.0, 0.0, 1.0), (4.0, 5.0, 6.0))], [((0.0, 0.0, 0.0, 1.0), (4.0, 5.0, 6.0))] * 2):
+			geometry = self.patch(make_geometry(index_groups=False), T)
+			self.assertEqual(geometry.inverse_transforms, T)
+			self.assertEqual(geometry.index_groups, [])
+
+
+if __name__ == '__main__':
+	unittest.main()